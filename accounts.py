@@ -0,0 +1,106 @@
+from playwright.async_api import BrowserContext
+from contextlib import asynccontextmanager
+import asyncio
+from pool import PagePool
+from ratelimit import RateLimitGovernor
+
+
+class Account:
+    """One set of cookies with its own BrowserContext, page pool and rate limit budgets."""
+
+    # Budget assumed for an operation before the first response tells the real one
+    default_budget: int = 50
+
+    def __init__(self, name: str, auth_token: str, ct0: str, context: BrowserContext, pages: PagePool):
+        self.name = name
+        self.auth_token = auth_token
+        self.ct0 = ct0
+        self.context = context
+        self.pages = pages
+        # Where direct GraphQL calls go, the context's APIRequestContext unless replaced (e.g. by a ReplayServer)
+        self.request = context.request
+        # False for a context borrowed from a browser connected over CDP, which must outlive the client
+        self.owns_context = True
+        self.rate_limits: dict[str, RateLimitGovernor] = {}
+        self.in_flight: dict[str, int] = {}
+
+    def get_rate_limit(self, operation: str) -> RateLimitGovernor:
+        if operation not in self.rate_limits:
+            self.rate_limits[operation] = RateLimitGovernor(f"{self.name}:{operation}")
+        return self.rate_limits[operation]
+
+    def headroom(self, operation: str) -> int:
+        """Requests left for `operation`, minus the ones already running on this account."""
+        rate_limit = self.get_rate_limit(operation)
+        remaining = rate_limit.remaining if rate_limit.limit else self.default_budget
+        return remaining - self.in_flight.get(operation, 0)
+
+    def parked(self, operation: str) -> bool:
+        return self.get_rate_limit(operation).paused
+
+    def __repr__(self) -> str:
+        return f"Account(name={self.name!r}, in_flight={self.in_flight})"
+
+
+class AccountPool:
+    """
+    Schedule requests over several accounts.
+
+    Each request goes to the account with the most headroom for its operation.
+    Accounts whose operation is paused by its rate limit governor are parked and
+    skipped; only when every account is parked does `acquire` wait, and then only
+    until the first of them resumes.
+    """
+
+    def __init__(self):
+        self.accounts: list[Account] = []
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def __iter__(self):
+        return iter(self.accounts)
+
+    @property
+    def primary(self) -> Account:
+        return self.accounts[0] if self.accounts else None
+
+    def add(self, account: Account):
+        self.accounts.append(account)
+
+    def pick(self, operation: str) -> Account:
+        """The unparked account with the most headroom for `operation`, or None when all are parked."""
+        candidates = [account for account in self.accounts if not account.parked(operation)]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda account: account.headroom(operation))
+
+    async def choose(self, operation: str) -> Account:
+        if not self.accounts:
+            raise RuntimeError("No account available, call create_client first")
+        while True:
+            account = self.pick(operation)
+            if account is not None:
+                return account
+            waiters = [asyncio.ensure_future(account.get_rate_limit(operation).wait()) for account in self.accounts]
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    @asynccontextmanager
+    async def acquire(self, operation: str):
+        """Choose an account for `operation` and count the request against it while the block runs."""
+        account = await self.choose(operation)
+        account.in_flight[operation] = account.in_flight.get(operation, 0) + 1
+        try:
+            yield account
+        finally:
+            account.in_flight[operation] -= 1
+
+    async def close(self):
+        for account in self.accounts:
+            await account.pages.close()
+            if account.owns_context:
+                await account.context.close()
@@ -0,0 +1,79 @@
+"""Benchmark the TweetFilter pipeline at 10k, 100k and 1M tweets.
+
+Compares the previous chain of per-filter JSONPath passes, the single-pass
+row pipeline and the columnar NumPy pipeline. The columnar pipeline runs on
+columns extracted once by `frames`; how long that extraction takes is shown
+separately. Run from the repository root::
+
+    python -m benchmarks.filters [--sizes 10000 100000 1000000] [--legacy-max 100000]
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.payloads import make_tweets
+from filters import FilterPipeline
+from frames import tweets_to_arrow, tweets_to_columns
+from utils import get_jsonpath_result, change_twitter_date_format
+
+START = datetime.datetime(2023, 12, 20, tzinfo=datetime.timezone.utc)
+END = datetime.datetime(2023, 12, 30, tzinfo=datetime.timezone.utc)
+
+
+def legacy_chain(tweets: list[dict]) -> list[dict]:
+    """The filters as they were: one JSONPath pass per filter."""
+    tweets = list(filter(lambda t: not get_jsonpath_result(t, "$.legacy.in_reply_to_status_id_str"), tweets))
+    tweets = list(filter(lambda t: not get_jsonpath_result(t, "$.legacy.retweeted_status_result"), tweets))
+    tweets = list(filter(lambda t: not get_jsonpath_result(t, "$.legacy.quoted_status_id_str"), tweets))
+    return list(filter(lambda t: START <= change_twitter_date_format(get_jsonpath_result(t, "$.legacy.created_at")[0], 0) <= END, tweets))
+
+
+def pipeline() -> FilterPipeline:
+    return FilterPipeline().remove_replies().remove_retweets().remove_quotes().by_date(START, END)
+
+
+def run(name: str, fn, data, size: int) -> int:
+    start = time.perf_counter()
+    kept = fn(data)
+    elapsed = time.perf_counter() - start
+    kept = len(kept["id"]) if isinstance(kept, dict) else len(kept)
+    print(f"  {name:>16}: {elapsed * 1000:10.1f} ms  {size / elapsed:14,.0f} tweets/s  kept {kept:,}")
+    return kept
+
+
+def build(name: str, fn, tweets: list[dict]):
+    start = time.perf_counter()
+    frame = fn(tweets)
+    print(f"  {name:>16}: {(time.perf_counter() - start) * 1000:10.1f} ms  (extraction, not filtering)")
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="Skip the JSONPath chain above this size")
+    args = parser.parse_args()
+
+    # A 10k base batch (about 11 days of tweets) repeated to each size keeps memory reasonable at 1M
+    base = make_tweets(10_000)
+    # Synthetic ids are not real snowflakes, so give each tweet an id matching its created_at
+    for tweet in base:
+        created = change_twitter_date_format(tweet["legacy"]["created_at"], 0)
+        tweet["rest_id"] = str((int(created.timestamp() * 1000) - 1288834974657) << 22)
+
+    for size in args.sizes:
+        tweets = (base * (size // len(base) + 1))[:size]
+        print(f"{size:,} tweets")
+        results = []
+        if size <= args.legacy_max:
+            results.append(run("jsonpath", legacy_chain, tweets, size))
+        results.append(run("row", pipeline().apply, tweets, size))
+        columns = build("build columns", tweets_to_columns, tweets)
+        results.append(run("columnar dict", pipeline().apply_columnar, columns, size))
+        table = build("build arrow", tweets_to_arrow, tweets)
+        results.append(run("columnar arrow", pipeline().apply_columnar, table, size))
+        assert len(set(results)) == 1, results
+
+
+if __name__ == "__main__":
+    main()
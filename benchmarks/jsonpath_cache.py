@@ -0,0 +1,58 @@
+"""Compare cached and uncached JSONPath extraction over a timeline payload.
+
+Run from the repository root::
+
+    python -m benchmarks.jsonpath_cache [--payload recorded.json] [--rounds 200]
+"""
+import argparse
+import timeit
+
+from jsonpath_ng.ext import parse
+
+from benchmarks.payloads import load_payload
+from utils import JsonPathExtractor, get_jsonpath_result
+
+# Extractors that keep their compiled expression after the first call, skipping the LRU lookup of get_jsonpath_result
+TWEET_RESULTS = JsonPathExtractor("$..entries..itemContent.tweet_results.result")
+LEGACY_CREATED_AT = JsonPathExtractor("$.legacy.created_at")
+LEGACY_IN_REPLY_TO = JsonPathExtractor("$.legacy.in_reply_to_status_id_str")
+
+
+def uncached(json: dict, jsonpath: str) -> list:
+    return [match.value for match in parse(jsonpath).find(json)]
+
+
+def extract_uncached(payload: dict) -> int:
+    tweets = uncached(payload, "$..entries..itemContent.tweet_results.result")
+    kept = [t for t in tweets if not uncached(t, "$.legacy.in_reply_to_status_id_str")]
+    return len([uncached(t, "$.legacy.created_at") for t in kept])
+
+
+def extract_cached(payload: dict) -> int:
+    tweets = get_jsonpath_result(payload, "$..entries..itemContent.tweet_results.result")
+    kept = [t for t in tweets if not get_jsonpath_result(t, "$.legacy.in_reply_to_status_id_str")]
+    return len([get_jsonpath_result(t, "$.legacy.created_at") for t in kept])
+
+
+def extract_precompiled(payload: dict) -> int:
+    tweets = TWEET_RESULTS(payload)
+    kept = [t for t in tweets if not LEGACY_IN_REPLY_TO(t)]
+    return len([LEGACY_CREATED_AT(t) for t in kept])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload", help="Path to a recorded timeline response body")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = load_payload(args.payload)
+    assert extract_uncached(payload) == extract_cached(payload) == extract_precompiled(payload)
+
+    for name, fn in (("uncached", extract_uncached), ("cached", extract_cached), ("precompiled", extract_precompiled)):
+        seconds = timeit.timeit(lambda: fn(payload), number=args.rounds)
+        print(f"{name:>12}: {seconds / args.rounds * 1000:8.3f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Timeline payloads for the benchmarks.
+
+A recorded GraphQL response body (for example one saved from the ``UserTweets``
+interceptor) can be passed with ``--payload``. Without one, a synthetic payload
+with the same shape as a ``UserTweets`` page is generated.
+"""
+import datetime
+import json
+import random
+
+TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def make_user(rest_id: str, screen_name: str) -> dict:
+    return {
+        "__typename": "User",
+        "rest_id": rest_id,
+        "legacy": {
+            "created_at": "Tue Jun 02 20:12:29 +0000 2009",
+            "screen_name": screen_name,
+            "name": screen_name.title(),
+            "description": f"Synthetic account {screen_name}\nfor benchmarks",
+            "location": "Internet",
+            "favourites_count": 1200,
+            "normal_followers_count": 3400,
+            "friends_count": 560,
+            "listed_count": 78,
+            "statuses_count": 9000,
+        },
+    }
+
+
+def make_tweet(tweet_id: int, created_at: datetime.datetime, user: dict, reply: bool = False,
+               quote: bool = False, retweet: bool = False) -> dict:
+    legacy = {
+        "id_str": str(tweet_id),
+        "full_text": f"Synthetic tweet {tweet_id} #bench https://t.co/x @someone",
+        "created_at": created_at.strftime(TWITTER_DATE_FORMAT),
+        "favorite_count": tweet_id % 1000,
+        "bookmark_count": tweet_id % 17,
+        "quote_count": tweet_id % 7,
+        "reply_count": tweet_id % 31,
+        "retweet_count": tweet_id % 101,
+        "entities": {
+            "hashtags": [{"text": "bench"}],
+            "urls": [{"expanded_url": "https://example.com"}],
+            "user_mentions": [{"screen_name": "someone"}],
+        },
+    }
+    if reply:
+        legacy["in_reply_to_status_id_str"] = str(tweet_id - 1)
+    if quote:
+        legacy["quoted_status_id_str"] = str(tweet_id - 2)
+    if retweet:
+        legacy["retweeted_status_result"] = {"result": {"rest_id": str(tweet_id - 3)}}
+    return {
+        "__typename": "Tweet",
+        "rest_id": str(tweet_id),
+        "core": {"user_results": {"result": user}},
+        "views": {"count": str(tweet_id % 5000)},
+        "legacy": legacy,
+    }
+
+
+def make_timeline_page(count: int = 20, seed: int = 0, authors: int = 3,
+                       start: datetime.datetime = None, cursor: str = None) -> dict:
+    """Build a single ``UserTweets``-shaped page with ``count`` tweet entries."""
+    rng = random.Random(seed)
+    start = start or datetime.datetime(2023, 12, 31, tzinfo=datetime.timezone.utc)
+    users = [make_user(str(1000 + i), f"user{i}") for i in range(authors)]
+    entries = []
+    for i in range(count):
+        tweet_id = 1_700_000_000_000_000_000 - seed * 10_000 - i
+        created_at = start - datetime.timedelta(minutes=seed * count * 30 + i * 30)
+        tweet = make_tweet(tweet_id, created_at, rng.choice(users),
+                           reply=rng.random() < 0.3, quote=rng.random() < 0.1, retweet=rng.random() < 0.1)
+        entries.append({
+            "entryId": f"tweet-{tweet_id}",
+            "content": {
+                "entryType": "TimelineTimelineItem",
+                "itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": tweet}},
+            },
+        })
+    entries.append({
+        "entryId": f"cursor-bottom-{seed}",
+        "content": {"entryType": "TimelineTimelineCursor", "cursorType": "Bottom",
+                    "value": cursor or f"CURSOR-{seed + 1}"},
+    })
+    return {"data": {"user": {"result": {"timeline_v2": {"timeline": {"instructions": [
+        {"type": "TimelineAddEntries", "entries": entries},
+    ]}}}}}}
+
+
+def make_tweets(count: int, seed: int = 0, authors: int = 3) -> list[dict]:
+    """Build ``count`` raw ``tweet_results.result`` dicts."""
+    rng = random.Random(seed)
+    start = datetime.datetime(2023, 12, 31, tzinfo=datetime.timezone.utc)
+    users = [make_user(str(1000 + i), f"user{i}") for i in range(authors)]
+    return [
+        make_tweet(1_700_000_000_000_000_000 - i, start - datetime.timedelta(minutes=i), rng.choice(users),
+                   reply=rng.random() < 0.3, quote=rng.random() < 0.1, retweet=rng.random() < 0.1)
+        for i in range(count)
+    ]
+
+
+def load_payload(path: str = None, count: int = 20) -> dict:
+    """Load a recorded response body from ``path`` or fall back to a synthetic page."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return make_timeline_page(count)
+
+
+def make_recording(directory: str, pages: int = 10, count: int = 20) -> str:
+    """
+    Write a synthetic recording that a ``ReplayServer`` can serve: a user, and
+    ``pages`` chained pages of ``count`` tweets for each of ``UserTweets``,
+    ``SearchTimeline`` and ``TweetDetail``.
+    """
+    from replay import ResponseRecorder, graphql_url
+
+    recorder = ResponseRecorder(directory)
+    recorder.save("UserByScreenName", graphql_url("UserByScreenName", {"screen_name": "user0"}),
+                  {"data": {"user": {"result": make_user("1000", "user0")}}})
+    timelines = {
+        "UserTweets": {"userId": "1000", "count": count},
+        "SearchTimeline": {"rawQuery": "bench", "count": count, "querySource": "typed_query", "product": "Top"},
+        "TweetDetail": {"focalTweetId": str(1_700_000_000_000_000_000), "with_rux_injections": False},
+    }
+    for operation, variables in timelines.items():
+        cursor = None
+        for seed in range(pages):
+            page_variables = dict(variables, cursor=cursor) if cursor else variables
+            next_cursor = f"{operation}-CURSOR-{seed + 1}"
+            recorder.save(operation, graphql_url(operation, page_variables),
+                          make_timeline_page(count, seed=seed, cursor=next_cursor))
+            cursor = next_cursor
+    return directory
@@ -0,0 +1,115 @@
+"""Measure parsing and the public TwitterApi methods offline, against a recorded or synthetic set of GraphQL responses.
+
+The parse benchmark needs nothing but the recording. The end-to-end benchmark
+(``--e2e``) launches headless Chromium (``playwright install chromium``) and
+serves it the recording through a ``ReplayServer``, so no twitter.com session is
+needed. Record real responses with ``TwitterApi.set_recorder(directory)``.
+
+Run from the repository root::
+
+    python -m benchmarks.replay_suite [--recording DIR] [--pages 10] [--count 20] [--e2e] [--direct]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.payloads import make_recording
+from records import PageRecord
+
+
+def load_bodies(directory: str) -> list[tuple[str, dict]]:
+    bodies = []
+    for operation in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, operation)
+        if os.path.isdir(folder):
+            for name in sorted(os.listdir(folder)):
+                with open(os.path.join(folder, name), encoding="utf-8") as f:
+                    bodies.append((operation, json.load(f)["body"]))
+    return bodies
+
+
+def bench_parse(bodies: list[tuple[str, dict]], rounds: int):
+    """Pages/sec and time per tweet of PageRecord.from_json, then its peak memory in a separate run."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        tweets = sum(len(PageRecord.from_json(operation, body).tweets) for operation, body in bodies)
+    elapsed = time.perf_counter() - start
+    pages = len(bodies) * rounds
+
+    tracemalloc.start()
+    records = [PageRecord.from_json(operation, body) for operation, body in bodies]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del records
+
+    print(f"parse: {pages / elapsed:,.0f} pages/s, {elapsed / max(tweets * rounds, 1) * 1e6:.1f} µs/tweet, "
+          f"peak {peak / 2**20:.1f} MiB for {len(bodies)} pages")
+
+
+async def bench_e2e(directory: str, direct: bool):
+    """Latency, pages/sec and Python peak memory of each public method, served by a ReplayServer."""
+    from replay import ReplayServer
+    from twitter import TwitterApi
+
+    server = ReplayServer(directory)
+    api = TwitterApi()
+    await api.create_client("replay", "replay", headless=True)
+    api.set_delay((0, 0))
+    api.set_direct_pagination(direct)
+    await server.attach(api)
+
+    methods = {
+        "get_user_by_screen_name": lambda: api.get_user_by_screen_name("user0"),
+        "get_tweet_detail": lambda: api.get_tweet_detail(tweetid=str(1_700_000_000_000_000_000)),
+        "get_user_tweets": lambda: api.get_user_tweets("user0"),
+        "get_search_timeline": lambda: api.get_search_timeline("bench"),
+        "iter_tweet_replies": lambda: collect(api.iter_tweet_replies(tweetid=str(1_700_000_000_000_000_000))),
+    }
+    try:
+        for name, call in methods.items():
+            before = sum(server.requests.values())
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = await call()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            pages = sum(server.requests.values()) - before
+            items = len(result) if isinstance(result, list) else int(result is not None)
+            print(f"{name:>24}: {elapsed * 1000:8.0f} ms, {pages:3d} responses ({pages / elapsed:6.1f}/s), "
+                  f"{items:5d} items, peak {peak / 2**20:.1f} MiB")
+        print("stages:")
+        for stage, timing in sorted(api.metrics.snapshot()["stages"].items(), key=lambda item: -item[1]["total"]):
+            print(f"{stage:>30}: {timing['total'] * 1000:8.0f} ms over {timing['count']} runs")
+    finally:
+        await api.close_client()
+
+
+async def collect(tweets) -> list:
+    return [tweet async for tweet in tweets]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", help="Directory written by a ResponseRecorder. Synthetic pages by default.")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per timeline of the synthetic recording")
+    parser.add_argument("--count", type=int, default=20, help="Tweets per page of the synthetic recording")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--e2e", action="store_true", help="Also run the public methods in headless Chromium")
+    parser.add_argument("--direct", action="store_true", help="Paginate directly instead of scrolling in --e2e")
+    args = parser.parse_args()
+
+    directory = args.recording or make_recording(tempfile.mkdtemp(prefix="replay-"), args.pages, args.count)
+    bodies = load_bodies(directory)
+    print(f"{len(bodies)} recorded responses from {directory}")
+    bench_parse(bodies, args.rounds)
+    if args.e2e:
+        asyncio.run(bench_e2e(directory, args.direct))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure import time and time-to-first-tweet of cold and warm client starts.
+
+A cold start launches a fresh browser with only the two cookies. The warm
+starts reuse a persistent profile (``user_data_dir``, which keeps the HTTP
+cache) or a saved ``storage_state``; each is primed by one run first. With
+``--replay`` the pages are served from a synthetic recording, which isolates the
+browser's own startup cost; otherwise a live session is used.
+
+Run from the repository root::
+
+    python -m benchmarks.startup --auth-token ... --ct0 ... [--handle jack] [--runs 3]
+    python -m benchmarks.startup --replay [--runs 3]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import twitter; print(time.perf_counter() - start)"
+
+
+def bench_import(runs: int):
+    timings = [float(subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True,
+                                    check=True).stdout) for _ in range(runs)]
+    print(f"{'import twitter':>24}: {min(timings) * 1000:8.0f} ms (best of {runs})")
+
+
+async def first_tweet(args, recording: str, **client_options) -> float:
+    """Seconds from creating the client to the first tweet of `args.handle`."""
+    from twitter import TwitterApi
+
+    start = time.perf_counter()
+    api = TwitterApi()
+    await api.create_client(args.auth_token, args.ct0, headless=True, **client_options)
+    if recording is not None:
+        from replay import ReplayServer
+        await ReplayServer(recording).attach(api)
+    try:
+        async for _ in api.iter_user_tweets(args.handle, count=1):
+            break
+        elapsed = time.perf_counter() - start
+        if "storage_state" in client_options:
+            await api.save_storage_state(client_options["storage_state"])
+    finally:
+        await api.close_client()
+    return elapsed
+
+
+async def bench_first_tweet(args, recording: str):
+    directory = tempfile.mkdtemp(prefix="startup-")
+    modes = {
+        "cold": {},
+        "user_data_dir": {"user_data_dir": os.path.join(directory, "profile")},
+        "storage_state": {"storage_state": os.path.join(directory, "state.json")},
+    }
+    for mode, options in modes.items():
+        if options:
+            await first_tweet(args, recording, **options) # Prime the profile or the saved state
+        timings = [await first_tweet(args, recording, **options) for _ in range(args.runs)]
+        print(f"{mode:>24}: {min(timings) * 1000:8.0f} ms to first tweet (best of {args.runs})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--auth-token")
+    parser.add_argument("--ct0")
+    parser.add_argument("--handle", default="user0")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--replay", action="store_true", help="Serve a synthetic recording instead of twitter.com")
+    args = parser.parse_args()
+    if not args.replay and not (args.auth_token and args.ct0):
+        parser.error("a live run needs --auth-token and --ct0, or use --replay")
+
+    recording = None
+    if args.replay:
+        from benchmarks.payloads import make_recording
+        recording = make_recording(tempfile.mkdtemp(prefix="replay-"), pages=2)
+        args.auth_token = args.auth_token or "replay"
+        args.ct0 = args.ct0 or "replay"
+
+    bench_import(args.runs)
+    asyncio.run(bench_first_tweet(args, recording))
+
+
+if __name__ == "__main__":
+    main()
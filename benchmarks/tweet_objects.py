@@ -0,0 +1,94 @@
+"""Compare memory and throughput of the slotted Tweet/User records against the eager classes they replaced.
+
+Run from the repository root::
+
+    python -m benchmarks.tweet_objects [--tweets 100000] [--authors 3]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.payloads import make_tweets
+from tweet import Tweet
+
+
+class EagerUser:
+    """The User class before lazy decoding: every field is decoded and the raw dict is kept."""
+
+    def __init__(self, user: dict):
+        self.user_dict = user
+        legacy = user.get("legacy")
+        self.id = user.get("rest_id") or None
+        self.created_at = legacy.get("created_at") or None
+        self.screen_name = legacy.get("screen_name") or None
+        self.name = legacy.get("name") or None
+        self.description = legacy.get("description") or None
+        self.location = legacy.get("location") or None
+        self.favourites_count = legacy.get("favourites_count") or 0
+        self.followers_count = legacy.get("normal_followers_count") or 0
+        self.friends_count = legacy.get("friends_count") or 0
+        self.listed_count = legacy.get("listed_count") or 0
+        self.statuses_count = legacy.get("statuses_count") or 0
+
+
+class EagerTweet:
+    """The Tweet class before lazy decoding, with one User per tweet."""
+
+    def __init__(self, tweet: dict):
+        self.tweet_dict = tweet
+        self.typename = tweet.get("__typename")
+        legacy = tweet.get("legacy")
+        self.user = EagerUser(tweet.get("core").get("user_results").get("result"))
+        self.id = legacy.get("id_str") or None
+        self.full_text = legacy.get("full_text") or None
+        self.created_at = legacy.get("created_at") or None
+        self.in_reply_to_status_id = legacy.get("in_reply_to_status_id_str") or None
+        self.quoted_status_id = legacy.get("quoted_status_id_str") or None
+        self.retweet_status_id = legacy.get("retweet_status_id_str") or None
+        self.favorite_count = legacy.get("favorite_count") or None
+        self.bookmark_count = legacy.get("bookmark_count") or None
+        self.quote_count = legacy.get("quote_count") or None
+        self.reply_count = legacy.get("reply_count") or None
+        self.retweet_count = legacy.get("retweet_count") or None
+        self.view_count = tweet.get("views").get("count") or None
+        entities = legacy.get("entities")
+        self.entity_medias = [media.get("media_url_https") for media in entities.get("media") or []]
+        self.entity_hastags = [hastag.get("text") for hastag in entities.get("hashtags") or []]
+        self.entity_urls = [url.get("expanded_url") for url in entities.get("urls") or []]
+        self.entity_user_mentions = [mention.get("screen_name") for mention in entities.get("user_mentions") or []]
+
+
+def measure(name: str, build, tweets: list[dict]):
+    gc.collect()
+    start = time.perf_counter()
+    objects = build(tweets)
+    elapsed = time.perf_counter() - start
+    del objects
+
+    gc.collect()
+    tracemalloc.start()
+    objects = build(tweets)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    users = len({id(tweet.user) for tweet in objects})
+    print(f"{name:>24}: {len(tweets) / elapsed:12,.0f} tweets/s  {peak / 2**20:8.1f} MiB peak  {users:>8} User objects")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tweets", type=int, default=100_000)
+    parser.add_argument("--authors", type=int, default=3)
+    args = parser.parse_args()
+
+    tweets = make_tweets(args.tweets, authors=args.authors)
+    print(f"{args.tweets:,} tweets from {args.authors} authors (object overhead only, raw dicts already in memory)")
+
+    measure("eager", lambda ts: [EagerTweet(t) for t in ts], tweets)
+    measure("slotted lazy", lambda ts: [Tweet(t) for t in ts], tweets)
+    measure("slotted lazy, 3 fields", lambda ts: [(o, o.id, o.full_text, o.user)[0] for o in map(Tweet, ts)], tweets)
+    measure("slotted, keep_raw=False", lambda ts: [Tweet(t, keep_raw=False) for t in ts], tweets)
+
+
+if __name__ == "__main__":
+    main()
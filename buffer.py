@@ -0,0 +1,91 @@
+import asyncio
+from records import PageRecord
+from network import NetworkStats
+
+_CLOSED = object()
+
+
+class ResponseBuffer:
+    """
+    The pages caught by one scrape.
+
+    Pages are handed to the consumer in arrival order through `async for`
+    and are dropped from the buffer once consumed. Only the first and the last
+    page are kept, for request capture and termination checks.
+
+    `account` and `rate_limit` are the account the scrape runs on and its
+    governor for the scraped operation. `stop_reason` says why the scrape
+    stopped: "since_id", "date", "pages", "count" when the consumer had enough
+    tweets or "end" when the timeline ran out.
+    `json_decodes` counts the response bodies decoded for this scrape. Every
+    body is decoded exactly once, so it should never exceed the number of
+    responses caught. `network` holds the request counters of the page that
+    made the scrape.
+
+    With a `checkpoint`, every appended page is also written to it. Pages
+    replayed from a checkpoint count as caught but are not written again, and
+    `captured` is the request template to continue the scrape from.
+    """
+
+    def __init__(self):
+        self.__queue: asyncio.Queue = asyncio.Queue()
+        self.__closed = False
+        self.count = 0
+        self.json_decodes = 0
+        self.network = NetworkStats()
+        self.account = None
+        self.stop_reason: str = None
+        self.rate_limit = None
+        self.first: PageRecord = None
+        self.last: PageRecord = None
+        self.captured = None
+        self.checkpoint = None
+        self.__replayed_cursors: set[str] = set()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    @property
+    def resuming(self) -> bool:
+        """Whether pages were replayed and the scrape can continue directly from the last cursor."""
+        return self.captured is not None and self.last is not None and self.last.cursor is not None
+
+    def replay(self, records: list[PageRecord]):
+        """Queue pages read back from a checkpoint."""
+        for record in records:
+            if record.cursor is not None:
+                self.__replayed_cursors.add(record.cursor)
+            self.__put(record)
+
+    def append(self, record: PageRecord):
+        if self.__closed:
+            return
+        if record.cursor in self.__replayed_cursors: # Fast-forward over pages that were already replayed
+            return
+        self.__put(record)
+        if self.checkpoint is not None:
+            self.checkpoint.save_page(record)
+
+    def __put(self, record: PageRecord):
+        if self.first is None:
+            self.first = record
+        self.last = record
+        self.count += 1
+        self.__queue.put_nowait(record)
+
+    def close(self):
+        """Mark the scrape as finished. Consumers stop after the remaining pages."""
+        if not self.__closed:
+            self.__closed = True
+            self.__queue.put_nowait(_CLOSED)
+
+    async def __aiter__(self):
+        while True:
+            record = await self.__queue.get()
+            if record is _CLOSED:
+                return
+            yield record
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+
+def cache_key(operation: str, variables: dict) -> str:
+    """The cache key of a GraphQL operation called with `variables`."""
+    return f"{operation}:{json.dumps(variables, sort_keys=True, separators=(',', ':'))}"
+
+
+class ResponseCache:
+    """
+    A TTL- and size-bounded cache of GraphQL results, keyed by operation and variables.
+
+    Entries live in an in-memory LRU of `max_entries`. With a `path`, they are
+    also written to a SQLite database, so a fresh process starts warm; entries
+    found on disk are promoted to memory. Values must be JSON serializable.
+
+    `hits` and `misses` count lookups. Set `bypass` to skip lookups while still
+    storing fresh results.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1024, path: str = None, max_disk_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.path = path
+        self.bypass = False
+        self.hits = 0
+        self.misses = 0
+        self.__entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__writes = 0
+        self.__connection = None
+        if path is not None:
+            self.__connection = sqlite3.connect(path, check_same_thread=False)
+            with self.__connection:
+                self.__connection.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+                )
+            self.__prune()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, operation: str, variables: dict):
+        """The fresh value stored for `operation` and `variables`, or None."""
+        if self.bypass:
+            return None
+        key = cache_key(operation, variables)
+        now = time.time()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self.__entries[key]
+                entry = None
+            if entry is None and self.__connection is not None:
+                row = self.__connection.execute(
+                    "SELECT expires_at, value FROM response_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]))
+                    self.__remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, operation: str, variables: dict, value, ttl: float = None):
+        """Store `value` for `operation` and `variables` for `ttl` seconds, the cache's TTL by default."""
+        key = cache_key(operation, variables)
+        entry = (time.time() + (ttl if ttl is not None else self.ttl), value)
+        with self.__lock:
+            self.__remember(key, entry)
+            if self.__connection is not None:
+                with self.__connection:
+                    self.__connection.execute(
+                        "INSERT OR REPLACE INTO response_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                        (key, entry[0], json.dumps(value, separators=(",", ":"))),
+                    )
+                self.__writes += 1
+                if self.__writes % 1000 == 0:
+                    self.__prune()
+
+    def __remember(self, key: str, entry: tuple[float, object]):
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+
+    def __prune(self):
+        """Drop expired entries from disk and the ones closest to expiry beyond `max_disk_entries`."""
+        with self.__connection:
+            self.__connection.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+            self.__connection.execute(
+                "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache "
+                "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,)
+            )
+
+    def invalidate(self, operation: str, variables: dict):
+        key = cache_key(operation, variables)
+        with self.__lock:
+            self.__entries.pop(key, None)
+            if self.__connection is not None:
+                with self.__connection:
+                    self.__connection.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            if self.__connection is not None:
+                with self.__connection:
+                    self.__connection.execute("DELETE FROM response_cache")
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
@@ -0,0 +1,95 @@
+from dataclasses import asdict
+import hashlib
+import json
+import os
+from graphql_request import CapturedRequest
+from records import PageRecord
+
+
+class Checkpoint:
+    """
+    An append-only JSONL log of one scrape: the captured GraphQL request and every
+    page caught so far. After a crash the scrape replays the logged pages and
+    continues from the last cursor instead of starting over.
+
+    Lines are {"type": "request", ...} and {"type": "page", ...}. The log is
+    removed once the scrape finished, so only unfinished scrapes are resumed.
+    """
+
+    def __init__(self, path: str, key: str, flush_every: int = 1):
+        self.path = path
+        self.key = key
+        self.flush_every = flush_every
+        self.request: CapturedRequest = None
+        self.pages: list[PageRecord] = []
+        self.__unflushed = 0
+        self.__file = None
+        self.__load()
+
+    @classmethod
+    def open(cls, directory: str, key: str, flush_every: int = 1) -> "Checkpoint":
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return cls(os.path.join(directory, f"{name}.jsonl"), key, flush_every)
+
+    def __load(self):
+        if not os.path.exists(self.path):
+            return
+        intact = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    break # A line cut short by the crash, everything before it is intact
+                intact += len(line)
+                if item["type"] == "request":
+                    self.request = CapturedRequest(**item["request"])
+                elif item["type"] == "page":
+                    self.pages.append(PageRecord.from_entries(item["operation"], item["entries"], item["module_items"]))
+        if intact < os.path.getsize(self.path):
+            os.truncate(self.path, intact)
+
+    @property
+    def resumable(self) -> bool:
+        return bool(self.pages)
+
+    @property
+    def cursor(self) -> str:
+        return self.pages[-1].cursor if self.pages else None
+
+    def __write(self, item: dict, flush: bool = False):
+        if self.__file is None:
+            self.__file = open(self.path, "a", encoding="utf-8")
+        self.__file.write(json.dumps(item, separators=(",", ":")) + "\n")
+        self.__unflushed += 1
+        if flush or self.__unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.__file is not None:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+        self.__unflushed = 0
+
+    def save_request(self, request: CapturedRequest):
+        self.request = request
+        self.__write({"type": "request", "request": asdict(request)}, flush=True)
+
+    def save_page(self, record: PageRecord):
+        self.__write({"type": "page", "operation": record.operation, "entries": record.entries,
+                      "module_items": record.module_items})
+
+    def complete(self):
+        """Remove the log of a finished scrape so it is not resumed."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        if self.__file is not None:
+            self.flush()
+            self.__file.close()
+            self.__file = None
@@ -0,0 +1,139 @@
+from typing import Iterator
+from utils import get_tweet_id, get_in_reply_to_id
+
+
+class ReplyNode:
+    """A tweet of a conversation and the ids of the replies to it."""
+
+    __slots__ = ("id", "parent_id", "tweet", "children")
+
+    def __init__(self, id: str, parent_id: str, tweet: dict):
+        self.id = id
+        self.parent_id = parent_id
+        self.tweet = tweet
+        self.children: list[str] = []
+
+    def __repr__(self) -> str:
+        return f"ReplyNode(id={self.id!r}, parent_id={self.parent_id!r}, children={len(self.children)})"
+
+
+class ConversationTree:
+    """
+    The replies of a tweet as a tree, indexed by id and by `in_reply_to_status_id_str`.
+
+    Tweets can arrive in any order: a reply whose parent has not been seen yet is
+    kept and linked when the parent arrives. Tweets are deduplicated by id.
+    `max_depth` drops replies deeper than that many levels below the root, also
+    those that arrived early and turn out too deep once their ancestors link in.
+    `max_breadth` drops the replies of a tweet beyond that many. The ids dropped
+    by a limit are remembered, so their replies are dropped too, whenever they arrive.
+    """
+
+    def __init__(self, root_id: str, max_depth: int = None, max_breadth: int = None):
+        self.root_id = str(root_id)
+        self.max_depth = max_depth
+        self.max_breadth = max_breadth
+        self.nodes: dict[str, ReplyNode] = {}
+        self.by_parent: dict[str, list[str]] = {}
+        self.__dropped: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, tweet_id: str) -> bool:
+        return tweet_id in self.nodes
+
+    @property
+    def root(self) -> ReplyNode:
+        return self.nodes.get(self.root_id)
+
+    def depth(self, tweet_id: str) -> int:
+        """Levels between `tweet_id` and the root, None when its chain does not reach the root yet."""
+        depth = 0
+        while tweet_id != self.root_id:
+            node = self.nodes.get(tweet_id)
+            if node is None or node.parent_id is None:
+                return None
+            tweet_id = node.parent_id
+            depth += 1
+        return depth
+
+    def add(self, tweet: dict) -> bool:
+        """Add a raw tweet result. False when it was already there or falls outside the limits."""
+        tweet_id = get_tweet_id(tweet)
+        if tweet_id is None or tweet_id in self.nodes:
+            return False
+        parent_id = get_in_reply_to_id(tweet) if tweet_id != self.root_id else None
+        if parent_id is None and tweet_id != self.root_id:
+            return False # Not a reply, e.g. an ad or the start of the thread above the root
+        if parent_id is not None:
+            if parent_id in self.__dropped:
+                self.__drop(tweet_id)
+                return False
+            siblings = self.by_parent.setdefault(parent_id, [])
+            if self.max_breadth is not None and len(siblings) >= self.max_breadth:
+                self.__drop(tweet_id)
+                return False
+            parent_depth = self.depth(parent_id)
+            if self.max_depth is not None and parent_depth is not None and parent_depth + 1 > self.max_depth:
+                self.__drop(tweet_id)
+                return False
+            siblings.append(tweet_id)
+        node = ReplyNode(tweet_id, parent_id, tweet)
+        node.children = self.by_parent.setdefault(tweet_id, [])
+        self.nodes[tweet_id] = node
+        if self.max_depth is not None and node.children:
+            depth = self.depth(tweet_id)
+            if depth is not None: # Replies that arrived before this tweet now have a known depth
+                self.__prune(tweet_id, depth)
+        return True
+
+    def __prune(self, tweet_id: str, depth: int):
+        """Remove the descendants of `tweet_id`, which is `depth` levels deep, that exceed `max_depth`."""
+        for child in list(self.by_parent.get(tweet_id, ())):
+            if depth + 1 > self.max_depth:
+                self.__drop(child)
+            elif child in self.nodes:
+                self.__prune(child, depth + 1)
+        if depth + 1 > self.max_depth:
+            self.by_parent[tweet_id].clear()
+
+    def __drop(self, tweet_id: str):
+        """Remove `tweet_id` and the replies below it that arrived early, and remember to drop later ones."""
+        self.__dropped.add(tweet_id)
+        for child in self.by_parent.pop(tweet_id, ()):
+            self.__drop(child)
+        self.nodes.pop(tweet_id, None)
+
+    def extend(self, tweets: list[dict]) -> int:
+        """Add raw tweet results and return how many were new."""
+        return sum(self.add(tweet) for tweet in tweets)
+
+    def children(self, tweet_id: str) -> list[ReplyNode]:
+        return [self.nodes[child] for child in self.by_parent.get(tweet_id, ()) if child in self.nodes]
+
+    def walk(self, tweet_id: str = None) -> Iterator[tuple[int, ReplyNode]]:
+        """Yield `(depth, node)` depth-first from `tweet_id`, the root by default, within the limits."""
+        start = tweet_id or self.root_id
+        if start not in self.nodes:
+            return
+        stack = [(0, self.nodes[start])]
+        while stack:
+            depth, node = stack.pop()
+            if self.max_depth is not None and depth > self.max_depth:
+                continue
+            yield depth, node
+            stack.extend((depth + 1, child) for child in reversed(self.children(node.id)))
+
+    def replies(self) -> list[dict]:
+        """The reply tweets reachable from the root, depth-first, without the root itself."""
+        return [node.tweet for depth, node in self.walk() if depth > 0]
+
+    def orphans(self) -> list[ReplyNode]:
+        """Tweets whose chain of parents does not reach the root, e.g. the thread above the root or replies to a deleted tweet."""
+        return [node for node in self.nodes.values() if node.id != self.root_id and self.depth(node.id) is None]
+
+    def to_dict(self, tweet_id: str = None) -> dict:
+        """The tree as nested `{"tweet": ..., "replies": [...]}` dicts."""
+        node = self.nodes[tweet_id or self.root_id]
+        return {"tweet": node.tweet, "replies": [self.to_dict(child.id) for child in self.children(node.id)]}
@@ -1,10 +1,10 @@
 from twitter import TwitterApi
 from tweet import Tweet
+from frames import tweets_to_dataframe
 import pandas as pd
 import datetime
 import logging
 import asyncio
-import mpu.io
 import json
 import os
 
@@ -23,17 +23,8 @@ START_DATE = datetime.datetime(S_YEAR, S_MONTH, S_DAY, tzinfo=JKT_TIMEZONE)
 END_DATE = datetime.datetime(E_YEAR, E_MONTH, E_DAY, tzinfo=JKT_TIMEZONE)
 
 async def get_user_tweets_in_range(twitter: TwitterApi):
-    range = (END_DATE - START_DATE).days
-    since = START_DATE
-    all_tweets = []
-    while range > 0:
-        until = since.__add__(datetime.timedelta(days=INTERVAL if range > INTERVAL else range))
-        print("\n-----", since, until, range)
-        tweets = await twitter.get_search_timeline(from_username=TWITTER_HANDLE, since=since, until=until, replies=False)
-        all_tweets.extend(tweets)
-        since = until
-        range -= INTERVAL    
-    return tweets
+    return await twitter.harvest_search_range(from_username=TWITTER_HANDLE, since=START_DATE, until=END_DATE,
+                                              replies=False, window_days=INTERVAL)
 
 async def main():
     async with TwitterApi(logging_level=logging.DEBUG) as twitter:
@@ -42,6 +33,7 @@ async def main():
         twitter.responses_wait_count = 50
 
         raw_tweets = await get_user_tweets_in_range(twitter)
+        tweets_df = tweets_to_dataframe(raw_tweets)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
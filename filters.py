@@ -1,27 +1,268 @@
-from utils import get_jsonpath_result, change_twitter_date_format
+from utils import twitter_date_to_timestamp, twitter_dates_to_datetime64
+from typing import AsyncIterable, AsyncIterator, Callable
 import datetime
 
+
+def _unwrap(tweet: dict) -> dict:
+    if tweet.get("__typename") == "TweetWithVisibilityResults":
+        return tweet.get("tweet") or {}
+    return tweet
+
+
+def _legacy(tweet: dict) -> dict:
+    return _unwrap(tweet).get("legacy") or {}
+
+
+def _screen_name(tweet: dict) -> str:
+    user = ((_unwrap(tweet).get("core") or {}).get("user_results") or {}).get("result") or {}
+    return (user.get("legacy") or {}).get("screen_name") or (user.get("core") or {}).get("screen_name")
+
+
+def _timestamp(tweet: dict) -> float:
+    """Creation time of a tweet in epoch seconds, None when it has no date."""
+    created_at = _legacy(tweet).get("created_at")
+    if not created_at:
+        return None
+    return twitter_date_to_timestamp(created_at, cache=True)
+
+
+def _bound(date: datetime.datetime) -> float:
+    return date.timestamp() if date is not None else None
+
+
+# Predicate columns and the `frames` column each one is derived from
+_FRAME_COLUMNS = {
+    "is_reply": "in_reply_to_status_id",
+    "is_retweet": "retweeted_status_id",
+    "is_quote": "quoted_status_id",
+    "screen_name": "screen_name",
+    "timestamp": "created_at",
+}
+
+
+def _frame_length(frame) -> int:
+    if isinstance(frame, dict):
+        return len(frame["id"])
+    return len(frame)
+
+
+def _frame_column(frame, name: str):
+    """A predicate column as a NumPy array, from a pyarrow Table, a DataFrame or a columns dict."""
+    import numpy as np
+
+    values = frame[_FRAME_COLUMNS[name]]
+    if isinstance(frame, dict):
+        if name == "timestamp":
+            return twitter_dates_to_datetime64(values).astype(np.int64) # NaT becomes negative, i.e. unknown
+        if name == "screen_name":
+            return np.array([(value or "").lower() for value in values], dtype=object)
+        return np.fromiter((value is not None for value in values), bool, len(values))
+    if hasattr(frame, "loc"): # pandas
+        if name == "timestamp":
+            return values.dt.tz_convert(None).to_numpy().astype("datetime64[s]").astype(np.int64)
+        if name == "screen_name":
+            return values.str.lower().fillna("").to_numpy(dtype=object)
+        return values.notna().to_numpy()
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if name == "timestamp":
+        return pc.cast(values, pa.timestamp("s", tz="UTC")).cast(pa.int64()).fill_null(-1).to_numpy()
+    if name == "screen_name":
+        return pc.utf8_lower(values).fill_null("").to_numpy(zero_copy_only=False)
+    return values.is_valid().to_numpy(zero_copy_only=False)
+
+
+class Predicate:
+    """
+    One condition of a FilterPipeline.
+
+    `row` decides for a single tweet dict. `column` names the predicate column,
+    derived from a `frames` column, and `mask` turns it into a boolean mask.
+    Predicates without a mask, e.g. from `where`, only run on tweet dicts.
+    """
+
+    __slots__ = ("name", "row", "column", "mask")
+
+    def __init__(self, name: str, row: Callable[[dict], bool], column: str = None, mask: Callable = None):
+        self.name = name
+        self.row = row
+        self.column = column
+        self.mask = mask
+
+    def __repr__(self) -> str:
+        return f"Predicate({self.name})"
+
+
+class FilterPipeline:
+    """
+    A chain of tweet predicates evaluated in a single pass.
+
+    Build it by chaining, then apply it to a list (`apply`), to an async iterator
+    (`stream`), or as NumPy boolean masks to a frame built by `frames` (`apply_columnar`):
+
+        pipeline = FilterPipeline().remove_replies().remove_retweets().by_date(start, end)
+        tweets = pipeline.apply(tweets)
+    """
+
+    def __init__(self):
+        self.predicates: list[Predicate] = []
+        self.count: int = None
+
+    def __repr__(self) -> str:
+        return f"FilterPipeline({', '.join(p.name for p in self.predicates)}, count={self.count})"
+
+    def add(self, predicate: Predicate) -> "FilterPipeline":
+        self.predicates.append(predicate)
+        return self
+
+    def where(self, row: Callable[[dict], bool], name: str = None) -> "FilterPipeline":
+        """Keep the tweets for which `row(tweet)` is true."""
+        return self.add(Predicate(name or getattr(row, "__name__", "where"), row))
+
+    def remove_replies(self) -> "FilterPipeline":
+        return self.add(Predicate("remove_replies", lambda tweet: not _legacy(tweet).get("in_reply_to_status_id_str"),
+                                  "is_reply", lambda column: ~column))
+
+    def remove_retweets(self) -> "FilterPipeline":
+        return self.add(Predicate("remove_retweets", lambda tweet: not _legacy(tweet).get("retweeted_status_result"),
+                                  "is_retweet", lambda column: ~column))
+
+    def remove_quotes(self) -> "FilterPipeline":
+        return self.add(Predicate("remove_quotes", lambda tweet: not _legacy(tweet).get("quoted_status_id_str"),
+                                  "is_quote", lambda column: ~column))
+
+    def by_user_handle(self, *handles: str) -> "FilterPipeline":
+        """Keep the tweets written by one of `handles`, ignoring case and a leading @."""
+        wanted = {handle.lstrip("@").lower() for handle in handles}
+
+        def row(tweet: dict) -> bool:
+            screen_name = _screen_name(tweet)
+            return screen_name is not None and screen_name.lower() in wanted
+
+        def mask(column):
+            import numpy as np
+            return np.isin(column, list(wanted))
+
+        return self.add(Predicate("by_user_handle", row, "screen_name", mask))
+
+    def by_date(self, start_date: datetime.datetime = None, end_date: datetime.datetime = None) -> "FilterPipeline":
+        """Keep the tweets created between `start_date` and `end_date`, both inclusive."""
+        start, end = _bound(start_date), _bound(end_date)
+
+        def row(tweet: dict) -> bool:
+            timestamp = _timestamp(tweet)
+            return timestamp is not None and (start is None or start <= timestamp) and (end is None or timestamp <= end)
+
+        def mask(column):
+            keep = column >= 0
+            if start is not None:
+                keep &= column >= start
+            if end is not None:
+                keep &= column <= end
+            return keep
+
+        return self.add(Predicate("by_date", row, "timestamp", mask))
+
+    def limit(self, count: int) -> "FilterPipeline":
+        """Stop after `count` tweets passed."""
+        self.count = count
+        return self
+
+    def compile(self) -> Callable[[dict], bool]:
+        """Fold the predicates into one function of a tweet."""
+        rows = tuple(predicate.row for predicate in self.predicates)
+
+        def keep(tweet: dict) -> bool:
+            for row in rows:
+                if not row(tweet):
+                    return False
+            return True
+
+        return keep
+
+    def apply(self, tweets: list[dict]) -> list[dict]:
+        """Filter `tweets` in one pass."""
+        keep = self.compile()
+        kept = []
+        for tweet in tweets:
+            if keep(tweet):
+                kept.append(tweet)
+                if self.count is not None and len(kept) >= self.count:
+                    break
+        return kept
+
+    def mask(self, frame):
+        """
+        The boolean NumPy mask of the rows of `frame` that pass. `frame` is the output
+        of `frames.tweets_to_arrow`, `tweets_to_dataframe` or `tweets_to_columns`, so
+        the tweets are extracted once and every predicate runs on whole columns.
+        """
+        import numpy as np
+
+        keep = np.ones(_frame_length(frame), dtype=bool)
+        columns = {}
+        for predicate in self.predicates:
+            if predicate.mask is None:
+                raise ValueError(f"{predicate.name} only runs on tweet dicts, use apply or stream")
+            if predicate.column not in columns:
+                columns[predicate.column] = _frame_column(frame, predicate.column)
+            keep &= predicate.mask(columns[predicate.column])
+        return keep
+
+    def apply_columnar(self, frame):
+        """
+        Filter a Table, DataFrame or columns dict from `frames` and return the same
+        type. On a Table or DataFrame this is far faster than `apply`, when the frame
+        is built anyway, e.g. for export; building it only to filter costs more than
+        the row pipeline. A columns dict still parses dates and copies lists in
+        Python and is about as fast as `apply`.
+        """
+        import numpy as np
+
+        keep = self.mask(frame)
+        if self.count is not None:
+            keep[np.flatnonzero(keep)[self.count:]] = False
+        if isinstance(frame, dict):
+            rows = np.flatnonzero(keep).tolist()
+            return {name: [values[i] for i in rows] for name, values in frame.items()}
+        if hasattr(frame, "loc"):
+            return frame[keep]
+        return frame.filter(keep)
+
+    async def stream(self, tweets: AsyncIterable[dict]) -> AsyncIterator[dict]:
+        """Filter an async iterator of tweets, e.g. `TwitterApi.iter_user_tweets`."""
+        keep = self.compile()
+        passed = 0
+        async for tweet in tweets:
+            if keep(tweet):
+                yield tweet
+                passed += 1
+                if self.count is not None and passed >= self.count:
+                    return
+
+
 class TweetFilter:
     @staticmethod
     def remove_replies(tweets: list[dict]) -> list[dict]:
-        return list(filter(lambda tweet: not get_jsonpath_result(tweet, "$.legacy.in_reply_to_status_id_str"), tweets))
-    
+        return FilterPipeline().remove_replies().apply(tweets)
+
     @staticmethod
     def remove_retweets(tweets: list[dict]) -> list[dict]:
-        return list(filter(lambda tweet: not get_jsonpath_result(tweet, "$.legacy.retweeted_status_result"), tweets))
-    
+        return FilterPipeline().remove_retweets().apply(tweets)
+
     @staticmethod
     def remove_quotes(tweets: list[dict]) -> list[dict]:
-        return list(filter(lambda tweet: not get_jsonpath_result(tweet, "$.legacy.quoted_status_id_str"), tweets))
-    
+        return FilterPipeline().remove_quotes().apply(tweets)
+
     @staticmethod
     def filter_by_user_handle(tweets: list[dict], handle: str) -> list[dict]:
-        return list(filter(lambda tweet: not get_jsonpath_result(tweet, "$.legacy.in_reply_to_status_id_str"), tweets))
+        return FilterPipeline().by_user_handle(handle).apply(tweets)
 
     @staticmethod
     def filter_by_date(tweets: list[dict], start_date: datetime, end_date: datetime) -> list[dict]:
-        return list(filter(lambda tweet: start_date <= change_twitter_date_format(get_jsonpath_result(tweet, "$.legacy.created_at")[0]) <= end_date, tweets))
-    
+        return FilterPipeline().by_date(start_date, end_date).apply(tweets)
+
     @staticmethod
     def filter_by_count(tweets: list[dict], count: int) -> list[dict]:
-        return tweets[:count]
\ No newline at end of file
+        return tweets[:count]
@@ -0,0 +1,128 @@
+"""
+Convert raw `tweet_results.result` dicts into columns, pandas DataFrames or
+pyarrow Tables in one pass, without creating a Tweet object per tweet.
+
+pandas and pyarrow are optional and only imported by the function that needs them.
+"""
+from utils import TWITTER_DATE_FORMAT, twitter_dates_to_datetime64
+
+COUNT_COLUMNS = ("favorite_count", "bookmark_count", "quote_count", "reply_count", "retweet_count", "view_count")
+ID_COLUMNS = ("id", "user_id", "in_reply_to_status_id", "quoted_status_id", "retweeted_status_id")
+STRING_COLUMNS = ("screen_name", "full_text", "lang")
+ENTITY_COLUMNS = {
+    "entity_medias": ("media", "media_url_https"),
+    "entity_hashtags": ("hashtags", "text"),
+    "entity_urls": ("urls", "expanded_url"),
+    "entity_user_mentions": ("user_mentions", "screen_name"),
+}
+COLUMNS = ID_COLUMNS + ("created_at",) + STRING_COLUMNS + COUNT_COLUMNS + tuple(ENTITY_COLUMNS)
+
+
+def _int_or_none(value) -> int:
+    return int(value) if value not in (None, "") else None
+
+
+def _retweeted_id(legacy: dict) -> str:
+    """The id of the retweeted tweet, which may itself be wrapped in TweetWithVisibilityResults."""
+    result = (legacy.get("retweeted_status_result") or {}).get("result") or {}
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+    return result.get("rest_id") or (result.get("legacy") or {}).get("id_str")
+
+
+def tweets_to_columns(tweets: list[dict]) -> dict[str, list]:
+    """
+    Turn raw tweet results into a dict of equally long column lists.
+
+    Ids are ints (None when missing), `created_at` is kept as Twitter's date
+    string, counts are ints with 0 for missing values and entities are lists of
+    strings. Results that are not tweets (tombstones, ...) are skipped.
+    """
+    columns: dict[str, list] = {name: [] for name in COLUMNS}
+    ids, user_ids, in_reply_to, quoted, retweeted = (columns[name] for name in ID_COLUMNS)
+    created_at = columns["created_at"]
+    screen_names, texts, langs = (columns[name] for name in STRING_COLUMNS)
+    counts = [columns[name] for name in COUNT_COLUMNS]
+    entity_columns = [(columns[name], key, field) for name, (key, field) in ENTITY_COLUMNS.items()]
+
+    for tweet in tweets:
+        if tweet.get("__typename") == "TweetWithVisibilityResults":
+            tweet = tweet.get("tweet") or {}
+        legacy = tweet.get("legacy")
+        if legacy is None:
+            continue
+        user = ((tweet.get("core") or {}).get("user_results") or {}).get("result") or {}
+
+        ids.append(_int_or_none(tweet.get("rest_id") or legacy.get("id_str")))
+        user_ids.append(_int_or_none(user.get("rest_id")))
+        in_reply_to.append(_int_or_none(legacy.get("in_reply_to_status_id_str")))
+        quoted.append(_int_or_none(legacy.get("quoted_status_id_str")))
+        retweeted.append(_int_or_none(_retweeted_id(legacy)))
+        created_at.append(legacy.get("created_at"))
+        screen_names.append((user.get("legacy") or {}).get("screen_name") or (user.get("core") or {}).get("screen_name"))
+        texts.append(legacy.get("full_text"))
+        langs.append(legacy.get("lang"))
+
+        counts[0].append(legacy.get("favorite_count") or 0)
+        counts[1].append(legacy.get("bookmark_count") or 0)
+        counts[2].append(legacy.get("quote_count") or 0)
+        counts[3].append(legacy.get("reply_count") or 0)
+        counts[4].append(legacy.get("retweet_count") or 0)
+        counts[5].append(int((tweet.get("views") or {}).get("count") or 0))
+
+        entities = legacy.get("entities") or {}
+        for column, key, field in entity_columns:
+            column.append([entity.get(field) for entity in entities.get(key) or []])
+
+    return columns
+
+
+def tweets_to_dataframe(tweets: list[dict]):
+    """
+    Build a pandas DataFrame from raw tweet results. Ids are nullable Int64,
+    `created_at` is datetime64 in UTC, counts are int64 and entities are list columns.
+    """
+    try:
+        import numpy as np
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("tweets_to_dataframe needs pandas, install it with `pip install pandas`") from e
+
+    columns = tweets_to_columns(tweets)
+    data = {}
+    for name in ID_COLUMNS:
+        data[name] = pd.array(columns[name], dtype="Int64")
+    data["created_at"] = pd.Series(twitter_dates_to_datetime64(columns["created_at"])).dt.tz_localize("UTC")
+    for name in STRING_COLUMNS:
+        data[name] = pd.array(columns[name], dtype="string")
+    for name in COUNT_COLUMNS:
+        data[name] = np.asarray(columns[name], dtype=np.int64)
+    for name in ENTITY_COLUMNS:
+        data[name] = columns[name]
+    return pd.DataFrame(data, columns=list(COLUMNS))
+
+
+def tweets_to_arrow(tweets: list[dict]):
+    """
+    Build a pyarrow Table from raw tweet results. Ids are int64, `created_at` is
+    a UTC timestamp, counts are int64 and entities are list<string> columns.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError as e:
+        raise ImportError("tweets_to_arrow needs pyarrow, install it with `pip install pyarrow`") from e
+
+    columns = tweets_to_columns(tweets)
+    arrays = {}
+    for name in ID_COLUMNS:
+        arrays[name] = pa.array(columns[name], type=pa.int64())
+    arrays["created_at"] = pc.strptime(pa.array(columns["created_at"], type=pa.string()),
+                                       format=TWITTER_DATE_FORMAT, unit="s").cast(pa.timestamp("s", tz="UTC"))
+    for name in STRING_COLUMNS:
+        arrays[name] = pa.array(columns[name], type=pa.string())
+    for name in COUNT_COLUMNS:
+        arrays[name] = pa.array(columns[name], type=pa.int64())
+    for name in ENTITY_COLUMNS:
+        arrays[name] = pa.array(columns[name], type=pa.list_(pa.string()))
+    return pa.table(arrays)
@@ -0,0 +1,73 @@
+from playwright.async_api import Request
+from dataclasses import dataclass, field
+import urllib.parse
+import json
+
+# Headers that the APIRequestContext sets on its own
+SKIPPED_HEADERS = {"cookie", "host", "content-length", "accept-encoding", "connection"}
+
+
+@dataclass
+class CapturedRequest:
+    """A GraphQL request made by the page, kept so later pages can be fetched directly."""
+    url: str
+    operation: str
+    variables: dict = field(default_factory=dict)
+    features: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+
+    @classmethod
+    async def from_request(cls, request: Request) -> "CapturedRequest":
+        parsed = urllib.parse.urlsplit(request.url)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        headers = {
+            name: value for name, value in (await request.all_headers()).items()
+            if not name.startswith(":") and name.lower() not in SKIPPED_HEADERS
+        }
+        return cls(
+            url=urllib.parse.urlunsplit((parsed.scheme, parsed.netloc, parsed.path, "", "")),
+            operation=parsed.path.rsplit("/", 1)[-1],
+            variables=request_variables(request.url),
+            features=json.loads(query.get("features", "{}")),
+            headers=headers,
+            params={name: value for name, value in query.items() if name not in ("variables", "features")},
+        )
+
+    def url_for(self, cursor: str = None, **variables) -> str:
+        """Build the request URL, optionally continuing from `cursor` and with some `variables` replaced."""
+        variables = {**self.variables, **variables}
+        if cursor is not None:
+            variables["cursor"] = cursor
+        query = {"variables": json.dumps(variables, separators=(",", ":"))}
+        if self.features:
+            query["features"] = json.dumps(self.features, separators=(",", ":"))
+        query.update(self.params)
+        return f"{self.url}?{urllib.parse.urlencode(query, quote_via=urllib.parse.quote)}"
+
+
+def request_variables(url: str) -> dict:
+    """The GraphQL variables of a request URL."""
+    query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+    return json.loads(query.get("variables", "{}"))
+
+
+def find_cursors(json: dict | list, cursor_type: str = "Bottom") -> list[str]:
+    """Find every cursor value of `cursor_type` in a GraphQL timeline response."""
+    cursors = []
+    stack = [json]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("cursorType") == cursor_type and "value" in node:
+                cursors.append(node["value"])
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return cursors
+
+
+def find_cursor(json: dict | list, cursor_type: str = "Bottom") -> str:
+    """Find the cursor of `cursor_type` that continues the timeline, or None."""
+    cursors = find_cursors(json, cursor_type)
+    return cursors[-1] if cursors else None
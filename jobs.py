@@ -0,0 +1,406 @@
+"""
+A durable job queue for scraping many handles, queries and tweets with several worker processes.
+
+Jobs live in a SQLite file. Workers lease one job at a time; a lease that is not
+renewed expires, so the job of a crashed worker goes back to the queue. Failed
+jobs are retried with exponential backoff up to `max_attempts`. Each worker
+process owns its own TwitterApi, and workers on several machines can share a
+queue file on shared storage (the rollback journal is used for that reason, WAL
+needs shared memory).
+
+    queue = JobQueue("jobs.db")
+    queue.put("user-timeline", {"handle": "jack", "pages": 10})
+    run_workers("jobs.db", processes=4, client_options={"auth_token": ..., "ct0": ...}, output_dir="out")
+    print(queue.summary())
+
+Or from the command line: `python jobs.py work jobs.db --processes 4 --auth-token ... --ct0 ...`.
+"""
+from dataclasses import dataclass
+import asyncio
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+JOB_TYPES = ("user-timeline", "search-window", "tweet-detail", "user-lookup")
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    type: str
+    params: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    lease_owner: str = None
+    lease_expires: float = None
+    run_after: float = None
+    items: int = None
+    error: str = None
+    started_at: float = None
+    finished_at: float = None
+    elapsed: float = None
+
+
+class JobQueue:
+    """
+    Jobs by status: "pending" (waiting, possibly until `run_after`), "running"
+    (leased), "done" and "failed" (out of attempts). A job with the same type and
+    params as a pending or running one is not added twice; once that one has
+    finished, the same job can be queued again, e.g. for the next incremental poll.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, type TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "lease_owner TEXT, lease_expires REAL, run_after REAL NOT NULL DEFAULT 0, "
+            "items INTEGER, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, elapsed REAL)"
+        )
+        self.__connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_active ON jobs (type, params) WHERE status IN ('pending', 'running')"
+        )
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_after)")
+
+    def put(self, type: str, params: dict, max_attempts: int = 3) -> int:
+        """Add a job and return its id, or the id of the identical job already pending or running."""
+        if type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type {type!r}, use one of {JOB_TYPES}")
+        encoded = json.dumps(params, sort_keys=True)
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR IGNORE INTO jobs (type, params, status, max_attempts, created_at) VALUES (?, ?, 'pending', ?, ?)",
+                (type, encoded, max_attempts, time.time()),
+            )
+            return self.__connection.execute(
+                "SELECT id FROM jobs WHERE type = ? AND params = ? AND status IN ('pending', 'running')", (type, encoded)
+            ).fetchone()[0]
+
+    def put_many(self, type: str, params: list[dict], max_attempts: int = 3) -> list[int]:
+        return [self.put(type, p, max_attempts) for p in params]
+
+    def lease(self, owner: str, lease_seconds: float = 300) -> Job:
+        """
+        Take the next due job, or a running one whose lease expired. None when nothing is due.
+        An expired job that is out of attempts, e.g. because it keeps crashing its worker, is marked failed.
+        """
+        now = time.time()
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.__connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'Lease expired on the last attempt'), "
+                    "finished_at = ?, lease_owner = NULL, lease_expires = NULL "
+                    "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = self.__connection.execute(
+                    "SELECT id FROM jobs WHERE (status = 'pending' AND run_after <= ?) "
+                    "OR (status = 'running' AND lease_expires < ? AND attempts < max_attempts) ORDER BY run_after, id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self.__connection.execute("COMMIT")
+                    return None
+                self.__connection.execute(
+                    "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (owner, now + lease_seconds, now, row[0]),
+                )
+                self.__connection.execute("COMMIT")
+            except BaseException:
+                self.__connection.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    def renew(self, job_id: int, owner: str, lease_seconds: float = 300) -> bool:
+        """Extend a lease. False when the job is no longer leased by `owner`."""
+        with self.__lock:
+            cursor = self.__connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, items: int, elapsed: float):
+        with self.__lock:
+            self.__connection.execute(
+                "UPDATE jobs SET status = 'done', items = ?, elapsed = ?, finished_at = ?, error = NULL, "
+                "lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+                (items, elapsed, time.time(), job_id, owner),
+            )
+
+    def fail(self, job_id: int, owner: str, error: str, backoff: float = 30, elapsed: float = None):
+        """Put a job back with exponential backoff, or mark it failed once it is out of attempts."""
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, owner)
+            ).fetchone()
+            if row is None:
+                return
+            attempts, max_attempts = row
+            if attempts >= max_attempts:
+                self.__connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, elapsed = ?, finished_at = ?, "
+                    "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                    (error, elapsed, time.time(), job_id),
+                )
+            else:
+                delay = backoff * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+                self.__connection.execute(
+                    "UPDATE jobs SET status = 'pending', error = ?, run_after = ?, "
+                    "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                    (error, time.time() + delay, job_id),
+                )
+
+    def get(self, job_id: int) -> Job:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT id, type, params, status, attempts, max_attempts, lease_owner, lease_expires, run_after, "
+                "items, error, started_at, finished_at, elapsed FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(row[0], row[1], json.loads(row[2]), *row[3:])
+
+    def jobs(self, status: str = None) -> list[Job]:
+        with self.__lock:
+            ids = [row[0] for row in self.__connection.execute(
+                "SELECT id FROM jobs WHERE ? IS NULL OR status = ? ORDER BY id", (status, status)
+            )]
+        return [self.get(job_id) for job_id in ids]
+
+    def counts(self) -> dict[str, int]:
+        with self.__lock:
+            return dict(self.__connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def summary(self) -> dict:
+        """Job counts by status and the throughput of the finished jobs."""
+        with self.__lock:
+            done, items, busy, first, last = self.__connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(items), 0), COALESCE(SUM(elapsed), 0), MIN(started_at), MAX(finished_at) "
+                "FROM jobs WHERE status = 'done'"
+            ).fetchone()
+            by_type = {
+                type: {"jobs": jobs, "items": type_items or 0, "mean_seconds": mean or 0.0}
+                for type, jobs, type_items, mean in self.__connection.execute(
+                    "SELECT type, COUNT(*), SUM(items), AVG(elapsed) FROM jobs WHERE status = 'done' GROUP BY type"
+                )
+            }
+        wall = (last - first) if done else 0.0
+        return {
+            "counts": self.counts(),
+            "done": done,
+            "items": items,
+            "busy_seconds": busy,
+            "wall_seconds": wall,
+            "jobs_per_second": done / wall if wall else 0.0,
+            "items_per_second": items / wall if wall else 0.0,
+            "by_type": by_type,
+        }
+
+    def close(self):
+        self.__connection.close()
+
+
+async def run_job(api, job: Job, sink=None, checkpoint: bool = False) -> int:
+    """
+    Run one job on a TwitterApi and return how many items it got. With `checkpoint`,
+    a retried timeline or search job resumes where its failed attempt stopped.
+    """
+    params = job.params
+    if job.type == "user-timeline":
+        tweets = await api.get_user_tweets(params["handle"], pages=params.get("pages"), count=params.get("count"),
+                                           incremental=params.get("incremental", False), checkpoint=checkpoint, sink=sink)
+        return len(tweets)
+    if job.type == "search-window":
+        since = datetime.datetime.fromisoformat(params["since"]) if params.get("since") else None
+        until = datetime.datetime.fromisoformat(params["until"]) if params.get("until") else None
+        tweets = await api.get_search_timeline(params.get("query", ""), params.get("from_username"), until, since,
+                                               params.get("replies", True), params.get("pages"),
+                                               checkpoint=checkpoint, sink=sink)
+        return len(tweets)
+    if job.type == "tweet-detail":
+        tweet = await api.get_tweet_detail(tweetid=params["tweetid"])
+        if tweet is None:
+            raise LookupError(f"Tweet {params['tweetid']} not found")
+        if sink is not None:
+            await sink.append_async(tweet)
+        return 1
+    if job.type == "user-lookup":
+        user = await api.get_user_by_screen_name(params["screen_name"])
+        if user is None:
+            raise LookupError(f"User {params['screen_name']} not found")
+        if sink is not None:
+            await sink.append_async(user)
+        return 1
+    raise ValueError(f"Unknown job type {job.type!r}")
+
+
+class Worker:
+    """
+    Lease jobs from a queue and run them on one TwitterApi until the queue is drained.
+
+    With an `output_dir`, each job writes its items to `<output_dir>/<type>/<id>.jsonl.gz`;
+    a retried job overwrites the file of its failed attempt. With a `checkpoint_dir`
+    shared by the workers, it also resumes the pages that attempt already got.
+    Incremental jobs (`"incremental": true`) need a `sync_state` database shared by
+    the workers; a SQLite path, since a JSON store would be overwritten by each process.
+    """
+
+    def __init__(
+        self,
+        queue_path: str,
+        client_options: dict = None,
+        output_dir: str = None,
+        checkpoint_dir: str = None,
+        sync_state: str = None,
+        lease_seconds: float = 300,
+        backoff: float = 30,
+        idle_sleep: float = 5,
+        name: str = None,
+    ):
+        self.queue_path = queue_path
+        self.client_options = client_options or {}
+        self.output_dir = output_dir
+        self.checkpoint_dir = checkpoint_dir
+        if sync_state is not None and sync_state.endswith(".json"):
+            raise ValueError("Workers share the sync state, use a SQLite path instead of a JSON file")
+        self.sync_state = sync_state
+        self.lease_seconds = lease_seconds
+        self.backoff = backoff
+        self.idle_sleep = idle_sleep
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+
+    async def __keep_leased(self, queue: JobQueue, job: Job):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not queue.renew(job.id, self.name, self.lease_seconds):
+                self.logger.warning(f"{self.name} lost the lease of job {job.id}")
+                return
+
+    async def __run_one(self, api, queue: JobQueue, job: Job):
+        from sinks import JsonlSink
+
+        sink = JsonlSink(os.path.join(self.output_dir, job.type, f"{job.id}.jsonl.gz")) if self.output_dir else None
+        renewer = asyncio.create_task(self.__keep_leased(queue, job))
+        start = time.perf_counter()
+        try:
+            items = await run_job(api, job, sink, checkpoint=self.checkpoint_dir is not None)
+            if sink is not None:
+                await sink.close_async()
+            queue.complete(job.id, self.name, items, time.perf_counter() - start)
+            self.logger.info(f"{self.name} finished job {job.id} ({job.type}) with {items} items")
+        except Exception as e:
+            if sink is not None:
+                await sink.close_async()
+            queue.fail(job.id, self.name, f"{type(e).__name__}: {e}", self.backoff, time.perf_counter() - start)
+            self.logger.warning(f"{self.name} failed job {job.id} ({job.type}), attempt {job.attempts}: {e}")
+        finally:
+            renewer.cancel()
+
+    async def run(self, max_jobs: int = None, stop_when_empty: bool = True) -> int:
+        """Run jobs until the queue has nothing left to lease (or `max_jobs`) and return how many ran."""
+        from state import open_sync_state
+        from twitter import TwitterApi
+
+        queue = JobQueue(self.queue_path)
+        sync_state = open_sync_state(self.sync_state) if self.sync_state is not None else None
+        ran = 0
+        try:
+            async with TwitterApi() as api:
+                await api.create_client(**{"headless": True, **self.client_options})
+                if self.checkpoint_dir is not None:
+                    api.set_checkpoint_dir(self.checkpoint_dir)
+                if sync_state is not None:
+                    api.set_sync_state(sync_state)
+                while max_jobs is None or ran < max_jobs:
+                    job = queue.lease(self.name, self.lease_seconds)
+                    if job is None:
+                        counts = queue.counts()
+                        if stop_when_empty and not counts.get("pending") and not counts.get("running"):
+                            break
+                        await asyncio.sleep(self.idle_sleep) # Retries are backing off or others hold leases
+                        continue
+                    await self.__run_one(api, queue, job)
+                    ran += 1
+        finally:
+            queue.close()
+            if sync_state is not None:
+                sync_state.close()
+        return ran
+
+
+def _work(queue_path: str, worker_options: dict) -> int:
+    return asyncio.run(Worker(queue_path, **worker_options).run())
+
+
+def run_workers(queue_path: str, processes: int = None, **worker_options) -> dict:
+    """
+    Drain a queue with `processes` worker processes, one per core by default, and
+    return the queue's summary. `worker_options` are passed to `Worker`.
+    """
+    processes = processes or os.cpu_count() or 1
+    context = multiprocessing.get_context("spawn") # Each worker starts its own event loop and browser
+    with context.Pool(processes) as pool:
+        pool.starmap(_work, [(queue_path, worker_options)] * processes)
+    queue = JobQueue(queue_path)
+    try:
+        return queue.summary()
+    finally:
+        queue.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Queue a job")
+    add.add_argument("queue")
+    add.add_argument("type", choices=JOB_TYPES)
+    add.add_argument("params", help='The job parameters as JSON, e.g. \'{"handle": "jack", "pages": 10}\'')
+    add.add_argument("--max-attempts", type=int, default=3)
+    work = commands.add_parser("work", help="Run worker processes until the queue is drained")
+    work.add_argument("queue")
+    work.add_argument("--processes", type=int)
+    work.add_argument("--auth-token")
+    work.add_argument("--ct0")
+    work.add_argument("--storage-state")
+    work.add_argument("--output-dir")
+    work.add_argument("--checkpoint-dir", help="Lets retried jobs resume instead of starting over")
+    work.add_argument("--sync-state", help="SQLite database of the high-water marks of incremental jobs")
+    summary = commands.add_parser("summary", help="Print job counts and throughput")
+    summary.add_argument("queue")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+    if args.command == "add":
+        queue = JobQueue(args.queue)
+        print(queue.put(args.type, json.loads(args.params), args.max_attempts))
+        queue.close()
+    elif args.command == "work":
+        client_options = {"auth_token": args.auth_token, "ct0": args.ct0, "storage_state": args.storage_state}
+        print(json.dumps(run_workers(args.queue, args.processes, client_options=client_options,
+                                     output_dir=args.output_dir, checkpoint_dir=args.checkpoint_dir,
+                                     sync_state=args.sync_state), indent=2))
+    else:
+        queue = JobQueue(args.queue)
+        print(json.dumps(queue.summary(), indent=2))
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
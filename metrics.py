@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from typing import Callable
+import threading
+import time
+
+# Stages timed by TwitterApi
+STAGES = (
+    "goto", "scroll", "delay", "spinners", "click_show_replies", "click_show_additional_replies",
+    "rate_limit_wait", "request", "interceptor", "json_decode", "extraction",
+)
+# Counters kept by TwitterApi
+COUNTERS = ("pages", "tweets", "bytes", "rate_limit_waits")
+
+
+class StageTiming:
+    """How often a stage ran and how long it took in total and at most, in seconds."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return f"StageTiming(count={self.count}, total={self.total:.3f}, max={self.max:.3f})"
+
+
+class ScrapeMetrics:
+    """
+    Per-stage timings and counters of the scrapes of a TwitterApi.
+
+    Every observation is also passed to the callbacks added with `add_callback`
+    as `callback(kind, name, value)`, where `kind` is "stage" (value in seconds)
+    or "counter" (value is the increment). `to_prometheus` renders everything in
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, StageTiming] = {}
+        self.counters: dict[str, float] = dict.fromkeys(COUNTERS, 0)
+        self.callbacks: list[Callable[[str, str, float], None]] = []
+        self.__lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[str, str, float], None]):
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str, str, float], None]):
+        self.callbacks.remove(callback)
+
+    def observe(self, stage: str, seconds: float):
+        with self.__lock:
+            self.stages.setdefault(stage, StageTiming()).observe(seconds)
+        for callback in self.callbacks:
+            callback("stage", stage, seconds)
+
+    def increment(self, counter: str, value: float = 1):
+        with self.__lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+        for callback in self.callbacks:
+            callback("counter", counter, value)
+
+    @contextmanager
+    def time(self, stage: str):
+        """Time the block as `stage`. Works around awaits too, it measures wall time."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            return {
+                "stages": {name: {"count": t.count, "total": t.total, "max": t.max, "mean": t.mean}
+                           for name, t in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def reset(self):
+        with self.__lock:
+            self.stages.clear()
+            self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def to_prometheus(self, prefix: str = "twitterfetch") -> str:
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each scrape stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, timing in sorted(snapshot["stages"].items()):
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {timing["total"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {timing["count"]}')
+        lines.append(f"# HELP {prefix}_stage_seconds_max Longest run of each scrape stage.")
+        lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for name, timing in sorted(snapshot["stages"].items()):
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {timing["max"]:.6f}')
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value:g}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,128 @@
+from playwright.async_api import Page, Route, Request, Response
+from dataclasses import dataclass, field
+import urllib.parse
+
+TWITTER_HOSTS = ("twitter.com", "x.com", "twimg.com")
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    """
+    Which requests a page is allowed to make.
+
+    Requests whose resource type is in `blocked_resource_types` are aborted, and
+    so are requests to hosts outside `allowed_hosts` when `block_third_party` is
+    set. Hosts in `blocked_hosts` are always aborted.
+    """
+    name: str
+    blocked_resource_types: frozenset[str] = frozenset()
+    block_third_party: bool = False
+    allowed_hosts: tuple[str, ...] = TWITTER_HOSTS
+    blocked_hosts: tuple[str, ...] = ()
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.blocked_resource_types or self.block_third_party or self.blocked_hosts)
+
+    def allows(self, request: Request) -> bool:
+        if request.resource_type in self.blocked_resource_types:
+            return False
+        host = urllib.parse.urlsplit(request.url).hostname or ""
+        if any(host == blocked or host.endswith("." + blocked) for blocked in self.blocked_hosts):
+            return False
+        if self.block_third_party and not any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts):
+            return False
+        return True
+
+
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "ads-twitter.com", "ads-api.twitter.com", "analytics.twitter.com", "static.ads-twitter.com",
+    "t.co", "scribe.twitter.com",
+)
+
+NETWORK_PROFILES: dict[str, NetworkProfile] = {
+    # Only what the timeline needs to issue its GraphQL requests
+    "minimal": NetworkProfile(
+        name="minimal",
+        blocked_resource_types=frozenset({"image", "media", "font", "stylesheet", "beacon", "ping", "manifest", "texttrack"}),
+        block_third_party=True,
+        blocked_hosts=TRACKER_HOSTS,
+    ),
+    # Drop heavy media and trackers, keep stylesheets so the layout still scrolls like a normal page
+    "balanced": NetworkProfile(
+        name="balanced",
+        blocked_resource_types=frozenset({"image", "media", "font", "beacon", "ping"}),
+        blocked_hosts=TRACKER_HOSTS,
+    ),
+    "full": NetworkProfile(name="full"),
+}
+
+
+@dataclass
+class NetworkStats:
+    """Request counters of one scrape."""
+    allowed_requests: int = 0
+    blocked_requests: int = 0
+    allowed_bytes: int = 0
+    blocked_by_type: dict[str, int] = field(default_factory=dict)
+
+    def record_blocked(self, request: Request):
+        self.blocked_requests += 1
+        self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+
+    def record_allowed(self, response: Response):
+        self.allowed_requests += 1
+        try:
+            self.allowed_bytes += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+
+def get_network_profile(profile: str | NetworkProfile) -> NetworkProfile:
+    if isinstance(profile, NetworkProfile):
+        return profile
+    try:
+        return NETWORK_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown network profile {profile!r}, expected one of {', '.join(NETWORK_PROFILES)}") from None
+
+
+class NetworkFilter:
+    """
+    Apply a NetworkProfile to pages and count what it blocks and allows.
+
+    Each page gets its own NetworkStats, which `reset` swaps out when the page
+    starts a new scrape.
+    """
+
+    def __init__(self, profile: str | NetworkProfile = "full"):
+        self.profile = get_network_profile(profile)
+        self.__stats: dict[Page, NetworkStats] = {}
+
+    def stats(self, page: Page) -> NetworkStats:
+        return self.__stats.setdefault(page, NetworkStats())
+
+    def reset(self, page: Page) -> NetworkStats:
+        self.__stats[page] = NetworkStats()
+        return self.__stats[page]
+
+    def forget(self, page: Page):
+        self.__stats.pop(page, None)
+
+    async def install(self, page: Page):
+        """Route the requests of `page` through the profile."""
+        self.reset(page)
+        page.on("response", lambda response: self.stats(page).record_allowed(response))
+        page.on("close", lambda _: self.forget(page))
+        if not self.profile.blocks_anything:
+            return
+
+        async def handle(route: Route):
+            if self.profile.allows(route.request):
+                await route.fallback()
+            else:
+                self.stats(page).record_blocked(route.request)
+                await route.abort("blockedbyclient")
+
+        await page.route("**/*", handle)
@@ -0,0 +1,77 @@
+from playwright.async_api import BrowserContext, Page
+from contextlib import asynccontextmanager
+import asyncio
+from network import NetworkFilter
+
+
+class PagePool:
+    """
+    A bounded pool of pages inside one BrowserContext.
+
+    At most `size` pages are borrowed at the same time. Pages are reused after
+    being released, unless the borrower raised, in which case the page is closed
+    so a broken page is never handed out again. New pages are routed through
+    `network` when it is given.
+    """
+
+    def __init__(self, context: BrowserContext, size: int = 4, network: NetworkFilter = None):
+        if size < 1:
+            raise ValueError("Page pool size must be at least 1")
+        self.context = context
+        self.size = size
+        self.network = network
+        self.__semaphore = asyncio.Semaphore(size)
+        self.__idle: list[Page] = []
+        self.__borrowed: set[Page] = set()
+
+    @property
+    def borrowed(self) -> int:
+        return len(self.__borrowed)
+
+    async def acquire(self) -> Page:
+        await self.__semaphore.acquire()
+        try:
+            while self.__idle:
+                page = self.__idle.pop()
+                if not page.is_closed():
+                    break
+            else:
+                page = await self.context.new_page()
+                if self.network is not None:
+                    await self.network.install(page)
+        except BaseException:
+            self.__semaphore.release()
+            raise
+        self.__borrowed.add(page)
+        return page
+
+    async def release(self, page: Page, discard: bool = False):
+        self.__borrowed.discard(page)
+        try:
+            if discard or page.is_closed():
+                if not page.is_closed():
+                    await page.close()
+            else:
+                self.__idle.append(page)
+        finally:
+            self.__semaphore.release()
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a page for the duration of the `async with` block."""
+        page = await self.acquire()
+        try:
+            yield page
+        except BaseException:
+            await self.release(page, discard=True)
+            raise
+        else:
+            await self.release(page)
+
+    async def close(self):
+        pages = self.__idle + list(self.__borrowed)
+        self.__idle.clear()
+        self.__borrowed.clear()
+        for page in pages:
+            if not page.is_closed():
+                await page.close()
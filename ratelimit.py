@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+import asyncio
+import time
+
+
+@dataclass(frozen=True)
+class RateLimitState:
+    limit: int = 0
+    remaining: int = 0
+    reset: int = 0
+
+    @property
+    def used(self) -> int:
+        return self.limit - self.remaining
+
+
+class RateLimitGovernor:
+    """
+    Track the x-rate-limit-* headers of one GraphQL operation and suspend the
+    scrapes that depend on it without blocking the event loop.
+
+    The interceptor calls `update` with the response headers and `pause` when it
+    decides to back off. Scrape loops `await wait()` before doing more work, so
+    only the tasks using this governor are suspended while it is paused.
+    """
+
+    def __init__(self, name: str = None):
+        self.name = name
+        self.__state = RateLimitState()
+        self.__ready = asyncio.Event()
+        self.__ready.set()
+        self.__updated = asyncio.Condition()
+        self.__resume_at = 0.0
+        self.__resume_handle: asyncio.TimerHandle = None
+        self.waits = 0
+
+    @property
+    def state(self) -> RateLimitState:
+        return self.__state
+
+    @property
+    def limit(self) -> int:
+        return self.__state.limit
+
+    @property
+    def remaining(self) -> int:
+        return self.__state.remaining
+
+    @property
+    def reset(self) -> int:
+        return self.__state.reset
+
+    @property
+    def paused(self) -> bool:
+        return not self.__ready.is_set()
+
+    @property
+    def resume_at(self) -> float:
+        """Epoch time at which a paused governor resumes, 0 when not paused."""
+        return self.__resume_at if self.paused else 0.0
+
+    async def update(self, headers: dict) -> RateLimitState:
+        """Read the rate limit headers of a response. Missing headers keep their previous value."""
+        try:
+            state = RateLimitState(
+                limit=int(headers.get("x-rate-limit-limit", self.__state.limit)),
+                remaining=int(headers.get("x-rate-limit-remaining", self.__state.remaining)),
+                reset=int(headers.get("x-rate-limit-reset", self.__state.reset)),
+            )
+        except (TypeError, ValueError):
+            return self.__state
+
+        self.__state = state
+        async with self.__updated:
+            self.__updated.notify_all()
+        return state
+
+    async def updated(self) -> RateLimitState:
+        """Wait for the next `update` and return the new state."""
+        async with self.__updated:
+            await self.__updated.wait()
+        return self.__state
+
+    def pause(self, seconds: float):
+        """Suspend waiters for `seconds`. Overlapping pauses extend to the latest end."""
+        self.pause_until(time.time() + seconds)
+
+    def pause_until(self, timestamp: float):
+        if timestamp <= time.time():
+            return
+        if self.paused and timestamp <= self.__resume_at:
+            return
+        self.__resume_at = timestamp
+        self.__ready.clear()
+        self.waits += 1
+        if self.__resume_handle is not None:
+            self.__resume_handle.cancel()
+        self.__resume_handle = asyncio.get_running_loop().call_later(timestamp - time.time(), self.resume)
+
+    def resume(self):
+        if self.__resume_handle is not None:
+            self.__resume_handle.cancel()
+            self.__resume_handle = None
+        self.__resume_at = 0.0
+        self.__ready.set()
+
+    async def wait(self):
+        """Return immediately when not paused, otherwise wait until the pause ends."""
+        await self.__ready.wait()
+
+    def __repr__(self) -> str:
+        return f"RateLimitGovernor(name={self.name!r}, state={self.__state}, paused={self.paused})"
@@ -0,0 +1,81 @@
+from playwright.async_api import Request
+from dataclasses import dataclass, field
+import datetime
+from utils import parse_twitter_date, get_tweet_id, INSTRUCTIONS, ITEM_TWEET_RESULTS, USER_RESULT
+from graphql_request import find_cursor
+
+
+@dataclass
+class PageRecord:
+    """
+    The parts of one GraphQL response that the scrapers use, decoded once when
+    the response is caught. Everything downstream reads from the record instead
+    of decoding the response body again.
+    """
+    operation: str
+    entries: list[dict] = field(default_factory=list)
+    module_items: list[dict] = field(default_factory=list)
+    tweets: list[dict] = field(default_factory=list)
+    module_tweets: list[dict] = field(default_factory=list)
+    user: dict = None
+    cursor: str = None
+    top_cursor: str = None
+    max_id: int = None
+    min_created_at: datetime.datetime = None
+    max_created_at: datetime.datetime = None
+    request: Request = field(default=None, repr=False)
+
+    @classmethod
+    def from_json(cls, operation: str, json: dict, request: Request = None) -> "PageRecord":
+        entries = []
+        module_items = []
+        for instructions in INSTRUCTIONS(json):
+            for instruction in instructions:
+                if "entries" in instruction:
+                    entries.extend(instruction["entries"])
+                # A single entry is a pinned tweet (TimelinePinEntry) or a replaced cursor
+                # (TimelineReplaceEntry); only the cursor belongs with the timeline
+                if "cursorType" in (instruction.get("entry") or {}).get("content", {}):
+                    entries.append(instruction["entry"])
+                if "moduleItems" in instruction:
+                    module_items.extend(instruction["moduleItems"])
+        users = USER_RESULT(json)
+        return cls.from_entries(operation, entries, module_items, users[0] if users else None, request)
+
+    @classmethod
+    def from_entries(cls, operation: str, entries: list[dict], module_items: list[dict] = None,
+                     user: dict = None, request: Request = None) -> "PageRecord":
+        """Build a record from already extracted entries, e.g. pages read back from a checkpoint."""
+        module_items = module_items or []
+        tweets = ITEM_TWEET_RESULTS(entries)
+        dates = [
+            parse_twitter_date(tweet["legacy"]["created_at"], cache=True)
+            for tweet in tweets if "created_at" in tweet.get("legacy", {})
+        ]
+        ids = [int(tweet_id) for tweet_id in map(get_tweet_id, tweets) if tweet_id]
+        return cls(
+            operation=operation,
+            entries=entries,
+            module_items=module_items,
+            tweets=tweets,
+            module_tweets=ITEM_TWEET_RESULTS(module_items),
+            user=user,
+            cursor=find_cursor(entries),
+            top_cursor=find_cursor(entries, "Top"),
+            max_id=max(ids, default=None),
+            min_created_at=min(dates, default=None),
+            max_created_at=max(dates, default=None),
+            request=request,
+        )
+
+
+@dataclass
+class BatchResult:
+    """The outcome of one item of a batch lookup: its `value`, or the `error` that stopped it."""
+    key: str
+    value: dict = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
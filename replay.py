@@ -0,0 +1,234 @@
+"""
+Record GraphQL responses from live scrapes and serve them back offline.
+
+`ResponseRecorder` saves every intercepted body (see `TwitterApi.set_recorder`).
+`ReplayServer` answers a BrowserContext from such a recording through
+`context.route`: pages get a stub of twitter.com that requests the timeline over
+XHR and renders `data-testid='tweet'` items as it is scrolled, and GraphQL
+requests get the recorded bodies. Direct pagination goes through
+`Account.request`, which `attach` points at the server as well.
+"""
+from playwright.async_api import BrowserContext, Route
+import json
+import os
+import time
+import urllib.parse
+from graphql_request import request_variables
+
+# Variables that tell one request of an operation from another
+IDENTITY_VARIABLES = ("userId", "screen_name", "rawQuery", "focalTweetId", "cursor")
+
+
+def graphql_url(operation: str, variables: dict, host: str = "https://twitter.com") -> str:
+    query = urllib.parse.urlencode({"variables": json.dumps(variables, separators=(",", ":"))}, quote_via=urllib.parse.quote)
+    return f"{host}/i/api/graphql/replay/{operation}?{query}"
+
+
+def _identity(variables: dict) -> tuple:
+    return tuple(
+        (name, str(variables[name]).lower() if name == "screen_name" else str(variables[name]))
+        for name in IDENTITY_VARIABLES if variables.get(name) is not None
+    )
+
+
+class ResponseRecorder:
+    """Save GraphQL response bodies as `<directory>/<operation>/<n>.json` files."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.counts: dict[str, int] = {}
+
+    def save(self, operation: str, url: str, body: dict):
+        folder = os.path.join(self.directory, operation)
+        if operation not in self.counts:
+            os.makedirs(folder, exist_ok=True)
+            self.counts[operation] = len(os.listdir(folder))
+        path = os.path.join(folder, f"{self.counts[operation]:06d}.json")
+        self.counts[operation] += 1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "variables": request_variables(url), "body": body}, f)
+
+
+class ReplayResponse:
+    """The parts of a Playwright APIResponse that the scrapers read."""
+
+    def __init__(self, url: str, status: int, headers: dict, body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.__body = body
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    async def body(self) -> bytes:
+        return self.__body
+
+    async def text(self) -> str:
+        return self.__body.decode()
+
+    async def json(self):
+        return json.loads(self.__body)
+
+
+class ReplayServer:
+    """
+    Serve a recording to Playwright instead of twitter.com.
+
+    A request is answered with the body recorded for the same operation and
+    identifying variables (user, query, tweet and cursor). Failing that, a first
+    page is answered with the first page recorded for the operation and a cursor
+    with the page recorded for that cursor. Anything else gets an empty result, which
+    ends the timeline. `requests` counts the GraphQL requests served per operation.
+    """
+
+    def __init__(self, directory: str = None, rate_limit: int = 100_000):
+        self.rate_limit = rate_limit
+        self.requests: dict[str, int] = {}
+        self.__by_identity: dict[tuple, bytes] = {}
+        self.__by_cursor: dict[tuple, bytes] = {}
+        if directory is not None:
+            self.load(directory)
+
+    def add(self, operation: str, variables: dict, body: dict):
+        encoded = json.dumps(body).encode()
+        self.__by_identity.setdefault((operation, _identity(variables)), encoded)
+        self.__by_cursor.setdefault((operation, variables.get("cursor")), encoded)
+
+    def load(self, directory: str):
+        """Add every recording found under `directory`."""
+        for operation in sorted(os.listdir(directory)):
+            folder = os.path.join(directory, operation)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                with open(os.path.join(folder, name), encoding="utf-8") as f:
+                    recording = json.load(f)
+                self.add(operation, recording["variables"], recording["body"])
+
+    def find(self, operation: str, variables: dict) -> bytes:
+        """The recorded body that answers `operation` with `variables`, or None."""
+        body = self.__by_identity.get((operation, _identity(variables)))
+        if body is None:
+            body = self.__by_cursor.get((operation, variables.get("cursor")))
+        return body
+
+    def respond(self, url: str) -> ReplayResponse:
+        operation = urllib.parse.urlsplit(url).path.rsplit("/", 1)[-1]
+        self.requests[operation] = self.requests.get(operation, 0) + 1
+        body = self.find(operation, request_variables(url)) or b'{"data":{}}'
+        headers = {
+            "content-type": "application/json",
+            "x-rate-limit-limit": str(self.rate_limit),
+            "x-rate-limit-remaining": str(self.rate_limit - 1),
+            "x-rate-limit-reset": str(int(time.time()) + 900),
+        }
+        return ReplayResponse(url, 200, headers, body)
+
+    async def get(self, url: str, headers: dict = None, **kwargs) -> ReplayResponse:
+        """Stand-in for `APIRequestContext.get`, used by direct pagination."""
+        return self.respond(url)
+
+    async def __handle(self, route: Route):
+        request = route.request
+        if "/graphql/" in request.url:
+            response = self.respond(request.url)
+            await route.fulfill(status=response.status, headers=response.headers, body=await response.body())
+        elif request.resource_type == "document":
+            await route.fulfill(status=200, content_type="text/html", body=STUB_HTML)
+        else:
+            await route.abort()
+
+    async def install(self, context: BrowserContext):
+        await context.route("**/*", self.__handle)
+
+    async def attach(self, api):
+        """Serve every account of a TwitterApi from this server, pages and direct pagination alike."""
+        for account in api.accounts:
+            await self.install(account.context)
+            account.request = self
+
+
+# A stand-in for the twitter.com app: it requests the page's timeline over XHR like
+# the real app, renders every tweet as a tall `data-testid='tweet'` item, and asks
+# for the next page, showing a spinner meanwhile, whenever the scraper scrolls.
+STUB_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Replay</title>
+<style>[data-testid=tweet]{height:300px} [role=progressbar]{height:100px}</style></head>
+<body><main id="timeline"></main>
+<script>
+const timeline = document.getElementById("timeline");
+let operation = null, variables = null, cursor = null, loading = false;
+
+function graphql(op, vars) {
+  return new Promise((resolve) => {
+    const xhr = new XMLHttpRequest();
+    xhr.open("GET", location.origin + "/i/api/graphql/replay/" + op + "?variables=" + encodeURIComponent(JSON.stringify(vars)));
+    xhr.onload = () => resolve(JSON.parse(xhr.responseText));
+    xhr.onerror = () => resolve({});
+    xhr.send();
+  });
+}
+
+function walk(node, visit) {
+  if (Array.isArray(node)) { node.forEach((child) => walk(child, visit)); }
+  else if (node && typeof node === "object") { visit(node); Object.values(node).forEach((child) => walk(child, visit)); }
+}
+
+function render(json) {
+  let next = null;
+  walk(json, (node) => {
+    if (node.tweet_results && node.tweet_results.result) {
+      const item = document.createElement("article");
+      item.dataset.testid = "tweet";
+      const legacy = node.tweet_results.result.legacy || {};
+      item.textContent = legacy.full_text || "";
+      timeline.appendChild(item);
+    }
+    if (node.cursorType === "Bottom" && node.value) { next = node.value; }
+  });
+  cursor = next;
+}
+
+async function load(vars) {
+  loading = true;
+  const spinner = document.createElement("div");
+  spinner.setAttribute("role", "progressbar");
+  timeline.appendChild(spinner);
+  render(await graphql(operation, vars));
+  spinner.remove();
+  loading = false;
+}
+
+const scrollTo = window.scrollTo.bind(window);
+window.scrollTo = (...args) => {
+  scrollTo(...args);
+  if (!loading && cursor) { load(Object.assign({}, variables, {cursor: cursor})); }
+};
+
+async function main() {
+  const path = location.pathname;
+  const status = path.match(/\\/status\\/(\\d+)/);
+  if (path.startsWith("/search")) {
+    const params = new URLSearchParams(location.search);
+    operation = "SearchTimeline";
+    variables = {rawQuery: params.get("q"), count: 20, querySource: "typed_query", product: params.get("f") === "live" ? "Latest" : "Top"};
+  } else if (status) {
+    operation = "TweetDetail";
+    variables = {focalTweetId: status[1], with_rux_injections: false};
+  } else {
+    const json = await graphql("UserByScreenName", {screen_name: path.split("/")[1]});
+    const user = ((json.data || {}).user || {}).result;
+    const name = document.createElement("div");
+    name.dataset.testid = "UserName";
+    name.textContent = user ? (user.legacy || {}).screen_name : "";
+    document.body.prepend(name);
+    operation = "UserTweets";
+    variables = {userId: user ? user.rest_id : "0", count: 20};
+  }
+  await load(variables);
+}
+main();
+</script></body></html>
+"""
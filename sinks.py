@@ -0,0 +1,239 @@
+"""
+Write raw tweets to disk as they arrive, in batches, from a background thread.
+
+Pass a sink to the `TwitterApi` scrapers with `sink=` and close it when done:
+
+    async with JsonlSink("tweets.jsonl.zst") as sink:
+        await twitter.get_user_tweets("jack", sink=sink)
+
+zstandard (for .zst) and pyarrow (for Parquet) are optional and only imported by
+the sink that needs them.
+"""
+from abc import ABC, abstractmethod
+import asyncio
+import gzip
+import json
+import os
+import queue
+import threading
+
+_CLOSE = object()
+
+
+class Sink(ABC):
+    """
+    Buffer rows and hand them in batches of `batch_size` to a writer thread.
+
+    At most `max_pending` batches wait for the thread; beyond that `append`
+    blocks until the disk catches up, so memory stays bounded. Coroutines use
+    `append_async` and `close_async` instead, which wait for the disk without
+    blocking the event loop. An error in the thread is raised by the next
+    `append`, `flush` or `close`.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, max_pending: int = 8):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = 0
+        self.__batch: list[dict] = []
+        self.__queue: queue.Queue = queue.Queue(max_pending)
+        self.__error: BaseException = None
+        self.__closed = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__thread = threading.Thread(target=self.__run, name=f"{type(self).__name__}({path})", daemon=True)
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_async()
+
+    def append(self, row: dict):
+        self.__batch.append(row)
+        if len(self.__batch) >= self.batch_size:
+            self.__submit()
+
+    async def append_async(self, row: dict):
+        self.__batch.append(row)
+        if len(self.__batch) >= self.batch_size:
+            self.__raise()
+            batch, self.__batch = self.__batch, []
+            self.rows += len(batch)
+            try:
+                self.__queue.put_nowait(batch)
+            except queue.Full: # The disk is behind, wait for it off the event loop
+                await asyncio.to_thread(self.__queue.put, batch)
+
+    def extend(self, rows: list[dict]):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        """Hand the buffered rows to the writer thread now, without waiting for a full batch."""
+        if self.__batch:
+            self.__submit()
+
+    def close(self):
+        """Write the remaining rows, wait for the writer thread and close the file."""
+        if self.__closed:
+            return
+        self.flush()
+        self.__closed = True
+        self.__queue.put(_CLOSE)
+        self.__thread.join()
+        self.__raise()
+
+    async def close_async(self):
+        await asyncio.to_thread(self.close)
+
+    def __submit(self):
+        self.__raise()
+        batch, self.__batch = self.__batch, []
+        self.rows += len(batch)
+        self.__queue.put(batch)
+
+    def __raise(self):
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def __run(self):
+        opened = False
+        batch = None
+        try:
+            while True:
+                batch = self.__queue.get()
+                if batch is _CLOSE and opened:
+                    break
+                if not opened: # Opened on the first batch, or on close so that empty output still exists
+                    self._open()
+                    opened = True
+                if batch is _CLOSE:
+                    break
+                self._write(batch)
+        except BaseException as e:
+            self.__error = e
+            while batch is not _CLOSE: # Keep draining so producers never block forever
+                batch = self.__queue.get()
+        finally:
+            if opened:
+                self._close()
+
+    # Called on the writer thread
+    @abstractmethod
+    def _open(self):
+        ...
+
+    @abstractmethod
+    def _write(self, rows: list[dict]):
+        ...
+
+    def _close(self):
+        pass
+
+
+class JsonlSink(Sink):
+    """
+    One JSON tweet per line, compressed with gzip or zstd when `compression` says so
+    or, by default, when the path ends in .gz or .zst.
+    """
+
+    def __init__(self, path: str, compression: str = None, level: int = None, batch_size: int = 1000, max_pending: int = 8):
+        if compression is None:
+            compression = "gzip" if path.endswith(".gz") else "zstd" if path.endswith(".zst") else None
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"Unknown compression {compression!r}, use 'gzip' or 'zstd'")
+        if compression == "zstd":
+            try:
+                import zstandard # noqa: F401
+            except ImportError as e:
+                raise ImportError("zstd compression needs zstandard, install it with `pip install zstandard`") from e
+        self.compression = compression
+        self.level = level
+        self.__file = None
+        self.__raw = None
+        super().__init__(path, batch_size, max_pending)
+
+    def _open(self):
+        if self.compression == "gzip":
+            self.__file = gzip.open(self.path, "wb", compresslevel=self.level if self.level is not None else 6)
+        elif self.compression == "zstd":
+            import zstandard
+            self.__raw = open(self.path, "wb")
+            compressor = zstandard.ZstdCompressor(level=self.level if self.level is not None else 3)
+            self.__file = compressor.stream_writer(self.__raw)
+        else:
+            self.__file = open(self.path, "wb")
+
+    def _write(self, rows: list[dict]):
+        self.__file.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows).encode())
+
+    def _close(self):
+        self.__file.close()
+        if self.__raw is not None:
+            self.__raw.close()
+
+
+class JsonArraySink(Sink):
+    """All tweets as one JSON array, e.g. for debugging dumps that other tools load whole."""
+
+    def __init__(self, path: str, indent: int = None, batch_size: int = 1000, max_pending: int = 8):
+        self.indent = indent
+        self.__file = None
+        self.__first = True
+        super().__init__(path, batch_size, max_pending)
+
+    def _open(self):
+        self.__file = open(self.path, "w", encoding="utf-8")
+        self.__file.write("[")
+
+    def _write(self, rows: list[dict]):
+        for row in rows:
+            self.__file.write("\n" if self.__first else ",\n")
+            self.__file.write(json.dumps(row, indent=self.indent))
+            self.__first = False
+
+    def _close(self):
+        self.__file.write("\n]\n")
+        self.__file.close()
+
+
+class ParquetSink(Sink):
+    """
+    The columns of `frames.tweets_to_arrow` in a Parquet file, one row group per
+    `batch_size` tweets.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50_000, compression: str = "zstd", max_pending: int = 2):
+        try:
+            import pyarrow.parquet # noqa: F401
+        except ImportError as e:
+            raise ImportError("ParquetSink needs pyarrow, install it with `pip install pyarrow`") from e
+        self.compression = compression
+        self.__writer = None
+        super().__init__(path, batch_size, max_pending)
+
+    def _open(self):
+        pass
+
+    def _write(self, rows: list[dict]):
+        import pyarrow.parquet as pq
+        from frames import tweets_to_arrow
+
+        table = tweets_to_arrow(rows)
+        if self.__writer is None:
+            self.__writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        self.__writer.write_table(table, row_group_size=max(len(table), 1))
+
+    def _close(self):
+        if self.__writer is not None:
+            self.__writer.close()
@@ -0,0 +1,122 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import datetime
+import json
+import os
+import sqlite3
+import threading
+
+
+@dataclass(frozen=True)
+class SyncState:
+    """The high-water mark of one handle or query."""
+    key: str
+    newest_id: int = None
+    cursor: str = None
+    updated_at: datetime.datetime = None
+
+
+class SyncStateStore(ABC):
+    """Where incremental scrapes keep their high-water marks, by key."""
+
+    @abstractmethod
+    def get(self, key: str) -> SyncState:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, newest_id: int, cursor: str = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    def close(self):
+        pass
+
+
+class SqliteSyncState(SyncStateStore):
+    """Keep high-water marks in a SQLite database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "key TEXT PRIMARY KEY, newest_id TEXT, cursor TEXT, updated_at TEXT)"
+            )
+
+    def get(self, key: str) -> SyncState:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT newest_id, cursor, updated_at FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return SyncState(key)
+        newest_id, cursor, updated_at = row
+        return SyncState(key, int(newest_id) if newest_id else None, cursor,
+                         datetime.datetime.fromisoformat(updated_at) if updated_at else None)
+
+    def set(self, key: str, newest_id: int, cursor: str = None):
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT INTO sync_state (key, newest_id, cursor, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET newest_id = excluded.newest_id, "
+                "cursor = COALESCE(excluded.cursor, sync_state.cursor), updated_at = excluded.updated_at",
+                (key, str(newest_id), cursor, now),
+            )
+
+    def delete(self, key: str):
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM sync_state WHERE key = ?", (key,))
+
+    def close(self):
+        self.__connection.close()
+
+
+class JsonSyncState(SyncStateStore):
+    """Keep high-water marks in a JSON file, rewritten atomically on every change."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__states: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.__states = json.load(f)
+
+    def get(self, key: str) -> SyncState:
+        state = self.__states.get(key)
+        if state is None:
+            return SyncState(key)
+        return SyncState(key, int(state["newest_id"]) if state.get("newest_id") else None, state.get("cursor"),
+                         datetime.datetime.fromisoformat(state["updated_at"]) if state.get("updated_at") else None)
+
+    def set(self, key: str, newest_id: int, cursor: str = None):
+        with self.__lock:
+            previous = self.__states.get(key, {})
+            self.__states[key] = {
+                "newest_id": str(newest_id),
+                "cursor": cursor or previous.get("cursor"),
+                "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            }
+            self.__save()
+
+    def delete(self, key: str):
+        with self.__lock:
+            if self.__states.pop(key, None) is not None:
+                self.__save()
+
+    def __save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.__states, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def open_sync_state(path: str) -> SyncStateStore:
+    """Open a JSON store for .json paths and a SQLite store otherwise."""
+    return JsonSyncState(path) if path.endswith(".json") else SqliteSyncState(path)
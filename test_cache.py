@@ -0,0 +1,60 @@
+import time
+
+from cache import ResponseCache, cache_key
+
+
+def test_key_ignores_variable_order():
+    assert cache_key("TweetDetail", {"a": 1, "b": 2}) == cache_key("TweetDetail", {"b": 2, "a": 1})
+
+
+def test_get_counts_hits_and_misses():
+    cache = ResponseCache()
+    assert cache.get("UserByScreenName", {"screen_name": "jack"}) is None
+    cache.set("UserByScreenName", {"screen_name": "jack"}, {"rest_id": "12"})
+    assert cache.get("UserByScreenName", {"screen_name": "jack"}) == {"rest_id": "12"}
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+
+def test_entries_expire():
+    cache = ResponseCache(ttl=0.05)
+    cache.set("TweetDetail", {"focalTweetId": "1"}, {"rest_id": "1"})
+    cache.set("TweetDetail", {"focalTweetId": "2"}, {"rest_id": "2"}, ttl=60)
+    time.sleep(0.1)
+    assert cache.get("TweetDetail", {"focalTweetId": "1"}) is None
+    assert cache.get("TweetDetail", {"focalTweetId": "2"}) == {"rest_id": "2"}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("op", {"k": 1}, 1)
+    cache.set("op", {"k": 2}, 2)
+    cache.get("op", {"k": 1})
+    cache.set("op", {"k": 3}, 3)
+    assert len(cache) == 2
+    assert cache.get("op", {"k": 2}) is None
+    assert cache.get("op", {"k": 1}) == 1
+
+
+def test_bypass_skips_lookups_but_still_stores():
+    cache = ResponseCache()
+    cache.bypass = True
+    cache.set("op", {"k": 1}, 1)
+    assert cache.get("op", {"k": 1}) is None
+    cache.bypass = False
+    assert cache.get("op", {"k": 1}) == 1
+
+
+def test_disk_entries_survive_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path=path)
+    cache.set("op", {"k": 1}, {"v": [1, 2]})
+    cache.set("op", {"k": 2}, {"v": 2})
+    cache.invalidate("op", {"k": 2})
+    cache.close()
+
+    cache = ResponseCache(path=path)
+    assert cache.get("op", {"k": 1}) == {"v": [1, 2]}
+    assert cache.get("op", {"k": 2}) is None
+    cache.clear()
+    assert cache.get("op", {"k": 1}) is None
+    cache.close()
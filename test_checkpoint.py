@@ -0,0 +1,68 @@
+import os
+
+from checkpoint import Checkpoint
+from graphql_request import CapturedRequest
+from records import PageRecord
+
+
+def tweet_entry(tweet_id: int) -> dict:
+    return {"entryId": f"tweet-{tweet_id}",
+            "content": {"itemContent": {"tweet_results": {"result": {"rest_id": str(tweet_id), "legacy": {}}}}}}
+
+
+def cursor_entry(value: str) -> dict:
+    return {"entryId": f"cursor-bottom-{value}",
+            "content": {"entryType": "TimelineTimelineCursor", "value": value, "cursorType": "Bottom"}}
+
+
+def page(first_id: int, cursor: str) -> PageRecord:
+    return PageRecord.from_entries("UserTweets", [tweet_entry(first_id), tweet_entry(first_id - 1), cursor_entry(cursor)])
+
+
+def request() -> CapturedRequest:
+    return CapturedRequest("https://twitter.com/i/api/graphql/x/UserTweets", "UserTweets", {"userId": "1"})
+
+
+def test_resumes_from_the_last_logged_page(tmp_path):
+    checkpoint = Checkpoint.open(str(tmp_path), "user:jack")
+    assert not checkpoint.resumable
+    checkpoint.save_request(request())
+    checkpoint.save_page(page(10, "c1"))
+    checkpoint.save_page(page(8, "c2"))
+    checkpoint.close()
+
+    resumed = Checkpoint.open(str(tmp_path), "user:jack")
+    assert resumed.resumable
+    assert resumed.request == request()
+    assert resumed.cursor == "c2"
+    assert [tweet["rest_id"] for record in resumed.pages for tweet in record.tweets] == ["10", "9", "8", "7"]
+    resumed.close()
+
+
+def test_keys_get_separate_logs(tmp_path):
+    checkpoint = Checkpoint.open(str(tmp_path), "user:jack")
+    checkpoint.save_page(page(10, "c1"))
+    checkpoint.close()
+    assert not Checkpoint.open(str(tmp_path), "user:other").resumable
+
+
+def test_a_line_cut_short_by_a_crash_is_dropped(tmp_path):
+    checkpoint = Checkpoint.open(str(tmp_path), "user:jack")
+    checkpoint.save_page(page(10, "c1"))
+    checkpoint.close()
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "page", "operation": "UserTw')
+
+    resumed = Checkpoint.open(str(tmp_path), "user:jack")
+    assert resumed.cursor == "c1"
+    resumed.save_page(page(8, "c2")) # Appends after the intact lines
+    resumed.close()
+    assert Checkpoint.open(str(tmp_path), "user:jack").cursor == "c2"
+
+
+def test_complete_removes_the_log(tmp_path):
+    checkpoint = Checkpoint.open(str(tmp_path), "user:jack")
+    checkpoint.save_page(page(10, "c1"))
+    checkpoint.complete()
+    assert not os.path.exists(checkpoint.path)
+    assert not Checkpoint.open(str(tmp_path), "user:jack").resumable
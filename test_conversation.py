@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from conversation import ConversationTree
+
+
+def tweet(tweet_id: int, parent_id: int = None) -> dict:
+    return {"rest_id": str(tweet_id),
+            "legacy": {"in_reply_to_status_id_str": str(parent_id) if parent_id is not None else None}}
+
+
+def chain(length: int) -> list[dict]:
+    """0 <- 1 <- 2 <- ... each tweet replying to the one before."""
+    return [tweet(0)] + [tweet(i, i - 1) for i in range(1, length)]
+
+
+def test_links_replies_that_arrive_before_their_parent():
+    tree = ConversationTree("0")
+    tree.extend(reversed(chain(4)))
+    assert [(depth, node.id) for depth, node in tree.walk()] == [(0, "0"), (1, "1"), (2, "2"), (3, "3")]
+    assert tree.orphans() == []
+
+
+def test_deduplicates_and_skips_non_replies():
+    tree = ConversationTree("0")
+    assert tree.extend([tweet(0), tweet(1, 0), tweet(1, 0), tweet(99)]) == 2
+    assert len(tree) == 2
+
+
+@pytest.mark.parametrize("order", [chain(6), list(reversed(chain(6)))])
+def test_max_depth_drops_deep_replies_in_any_order(order):
+    tree = ConversationTree("0", max_depth=2)
+    tree.extend(order)
+    assert sorted(tree.nodes) == ["0", "1", "2"]
+    assert len(tree) == len(list(tree.walk()))
+
+
+def test_replies_below_a_dropped_tweet_are_dropped_when_they_arrive():
+    tree = ConversationTree("0", max_depth=2)
+    tree.extend(chain(4))
+    assert not tree.add(tweet(4, 3))
+    assert len(tree) == 3
+
+
+def test_max_breadth_caps_replies_per_tweet():
+    tree = ConversationTree("0", max_breadth=2)
+    tree.extend([tweet(0), tweet(1, 0), tweet(2, 0), tweet(3, 0), tweet(4, 3)])
+    assert [node.id for node in tree.children("0")] == ["1", "2"]
+    assert "4" not in tree
+
+
+@pytest.mark.parametrize("max_depth, max_breadth", [(1, None), (2, None), (3, 2), (None, 3)])
+def test_len_matches_walk_for_every_arrival_order(max_depth, max_breadth):
+    tweets = [tweet(0)] + [tweet(i, random.Random(i).randrange(i)) for i in range(1, 40)]
+    for seed in range(50):
+        order = tweets[:]
+        random.Random(seed).shuffle(order)
+        tree = ConversationTree("0", max_depth, max_breadth)
+        tree.extend(order)
+        assert len(tree) == len(list(tree.walk()))
+
+
+def test_to_dict_nests_replies():
+    tree = ConversationTree("0")
+    tree.extend([tweet(0), tweet(1, 0), tweet(2, 1)])
+    nested = tree.to_dict()
+    assert nested["tweet"]["rest_id"] == "0"
+    assert nested["replies"][0]["replies"][0]["tweet"]["rest_id"] == "2"
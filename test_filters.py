@@ -0,0 +1,72 @@
+import asyncio
+import datetime
+
+import pytest
+
+from benchmarks.payloads import make_tweets
+from filters import FilterPipeline, TweetFilter
+from frames import tweets_to_arrow, tweets_to_columns, tweets_to_dataframe
+
+START = datetime.datetime(2023, 12, 30, 18, tzinfo=datetime.timezone.utc)
+END = datetime.datetime(2023, 12, 30, 22, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def tweets() -> list[dict]:
+    tweets = make_tweets(600)
+    for tweet in tweets[::5]: # Retweets of tweets wrapped in TweetWithVisibilityResults
+        retweeted = tweet["legacy"].get("retweeted_status_result")
+        if retweeted:
+            retweeted["result"] = {"__typename": "TweetWithVisibilityResults", "tweet": retweeted["result"]}
+    for i in range(0, len(tweets), 11):
+        tweets[i] = {"__typename": "TweetWithVisibilityResults", "tweet": tweets[i]}
+    return tweets
+
+
+def ids(frame) -> list[int]:
+    if isinstance(frame, dict):
+        return frame["id"]
+    if hasattr(frame, "loc"):
+        return frame["id"].tolist()
+    return frame.column("id").to_pylist()
+
+
+PIPELINES = {
+    "remove_replies": lambda: FilterPipeline().remove_replies(),
+    "remove_retweets": lambda: FilterPipeline().remove_retweets(),
+    "remove_quotes": lambda: FilterPipeline().remove_quotes(),
+    "by_user_handle": lambda: FilterPipeline().by_user_handle("@USER1"),
+    "by_date": lambda: FilterPipeline().by_date(START, END),
+    "all": lambda: FilterPipeline().remove_replies().remove_retweets().remove_quotes().by_date(START, END),
+    "limit": lambda: FilterPipeline().remove_retweets().limit(7),
+}
+
+
+@pytest.mark.parametrize("build", [tweets_to_arrow, tweets_to_dataframe, tweets_to_columns])
+@pytest.mark.parametrize("name", PIPELINES)
+def test_columnar_matches_rows(tweets, name, build):
+    expected = [int(tweet.get("rest_id") or tweet["tweet"]["rest_id"]) for tweet in PIPELINES[name]().apply(tweets)]
+    assert expected # Each pipeline keeps something, so the comparison means something
+    assert ids(PIPELINES[name]().apply_columnar(build(tweets))) == expected
+
+
+def test_columnar_rejects_row_only_predicates(tweets):
+    with pytest.raises(ValueError):
+        FilterPipeline().where(lambda tweet: True).apply_columnar(tweets_to_columns(tweets))
+
+
+def test_stream_matches_apply(tweets):
+    async def source():
+        for tweet in tweets:
+            yield tweet
+
+    async def collect(pipeline: FilterPipeline) -> list[dict]:
+        return [tweet async for tweet in pipeline.stream(source())]
+
+    pipeline = FilterPipeline().remove_replies().limit(20)
+    assert asyncio.run(collect(pipeline)) == pipeline.apply(tweets)
+
+
+def test_tweet_filter_keeps_its_interface(tweets):
+    assert TweetFilter.remove_retweets(tweets) == FilterPipeline().remove_retweets().apply(tweets)
+    assert TweetFilter.filter_by_count(tweets, 3) == tweets[:3]
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+
+def test_put_dedupes_pending_jobs_regardless_of_key_order(queue):
+    first = queue.put("user-timeline", {"handle": "jack", "pages": 2})
+    assert queue.put("user-timeline", {"pages": 2, "handle": "jack"}) == first
+    assert queue.counts() == {"pending": 1}
+
+
+def test_put_rejects_unknown_types(queue):
+    with pytest.raises(ValueError):
+        queue.put("likes", {})
+
+
+def test_finished_job_can_be_queued_again(queue):
+    first = queue.put("user-timeline", {"handle": "jack"})
+    job = queue.lease("w1")
+    assert queue.put("user-timeline", {"handle": "jack"}) == first # Still running
+    queue.complete(job.id, "w1", 10, 1.0)
+    second = queue.put("user-timeline", {"handle": "jack"})
+    assert second != first
+    assert queue.lease("w1").id == second
+
+
+def test_lease_is_exclusive(queue):
+    queue.put("tweet-detail", {"tweetid": "1"})
+    assert queue.lease("w1") is not None
+    assert queue.lease("w2") is None
+
+
+def test_fail_backs_off_then_gives_up(queue):
+    job_id = queue.put("user-lookup", {"screen_name": "jack"}, max_attempts=2)
+    queue.fail(queue.lease("w1").id, "w1", "boom", backoff=0.05)
+    job = queue.get(job_id)
+    assert job.status == "pending" and job.run_after > time.time()
+    assert queue.lease("w1") is None # Still backing off
+    time.sleep(0.1)
+    queue.fail(queue.lease("w1").id, "w1", "boom again", backoff=0.05)
+    job = queue.get(job_id)
+    assert job.status == "failed" and job.attempts == 2 and job.error == "boom again"
+
+
+def test_expired_lease_is_taken_over_until_out_of_attempts(queue):
+    job_id = queue.put("user-lookup", {"screen_name": "jack"}, max_attempts=2)
+    leases = 0
+    while queue.lease(f"w{leases}", lease_seconds=0.01) is not None:
+        leases += 1
+        time.sleep(0.02) # The worker "crashes" and its lease expires
+    assert leases == 2
+    assert queue.get(job_id).status == "failed"
+
+
+def test_lost_lease_cannot_be_renewed_or_completed(queue):
+    job_id = queue.put("user-lookup", {"screen_name": "jack"})
+    queue.lease("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+    queue.lease("w2")
+    assert not queue.renew(job_id, "w1")
+    queue.complete(job_id, "w1", 1, 0.1)
+    assert queue.get(job_id).status == "running"
+    assert queue.get(job_id).lease_owner == "w2"
+
+
+def test_summary_counts_items_per_type(queue):
+    for handle in ("a", "b"):
+        queue.put("user-timeline", {"handle": handle})
+    queue.put("user-lookup", {"screen_name": "c"})
+    while (job := queue.lease("w1")) is not None:
+        queue.complete(job.id, "w1", 10 if job.type == "user-timeline" else 1, 0.5)
+    summary = queue.summary()
+    assert summary["done"] == 3 and summary["items"] == 21
+    assert summary["by_type"]["user-timeline"] == {"jobs": 2, "items": 20, "mean_seconds": 0.5}
@@ -0,0 +1,42 @@
+from records import PageRecord
+
+
+def tweet_entry(tweet_id: int) -> dict:
+    return {"entryId": f"tweet-{tweet_id}",
+            "content": {"itemContent": {"tweet_results": {"result": {"rest_id": str(tweet_id), "legacy": {}}}}}}
+
+
+def cursor_entry(value: str, cursor_type: str = "Bottom") -> dict:
+    return {"entryId": f"cursor-{cursor_type.lower()}-{value}",
+            "content": {"entryType": "TimelineTimelineCursor", "value": value, "cursorType": cursor_type}}
+
+
+def timeline(*instructions: dict) -> dict:
+    return {"data": {"user": {"result": {"timeline_v2": {"timeline": {"instructions": list(instructions)}}}}}}
+
+
+def test_pinned_tweet_is_not_a_timeline_tweet():
+    body = timeline(
+        {"type": "TimelinePinEntry", "entry": tweet_entry(1)},
+        {"type": "TimelineAddEntries", "entries": [tweet_entry(10), tweet_entry(9), cursor_entry("c1")]},
+    )
+    record = PageRecord.from_json("UserTweets", body)
+    assert [tweet["rest_id"] for tweet in record.tweets] == ["10", "9"]
+    assert record.max_id == 10
+
+
+def test_replaced_cursor_continues_the_timeline():
+    body = timeline(
+        {"type": "TimelineAddEntries", "entries": [tweet_entry(10), cursor_entry("c1"), cursor_entry("t1", "Top")]},
+        {"type": "TimelineReplaceEntry", "entry": cursor_entry("c2")},
+    )
+    record = PageRecord.from_json("SearchTimeline", body)
+    assert record.cursor == "c2"
+    assert record.top_cursor == "t1"
+
+
+def test_module_items_are_kept_apart():
+    body = timeline({"type": "TimelineAddToModule", "moduleItems": [{"item": tweet_entry(5)["content"]}]})
+    record = PageRecord.from_json("TweetDetail", body)
+    assert record.tweets == []
+    assert [tweet["rest_id"] for tweet in record.module_tweets] == ["5"]
@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from utils import (
+    TWITTER_DATE_FORMAT,
+    change_twitter_date_format,
+    parse_twitter_date,
+    snowflake_to_datetime,
+    snowflake_to_timestamp,
+    snowflakes_to_datetime64,
+    twitter_date_to_timestamp,
+    twitter_dates_to_datetime64,
+)
+
+DATES = ["Wed Oct 10 20:19:24 +0000 2018", "Sun Dec 31 23:59:59 +0000 2023", "Mon Jan 01 00:00:00 +0530 2024"]
+
+
+@pytest.mark.parametrize("date", DATES)
+def test_parse_matches_strptime(date):
+    expected = datetime.datetime.strptime(date, TWITTER_DATE_FORMAT)
+    assert parse_twitter_date(date, tz=None) == expected
+    assert parse_twitter_date(date, cache=True) == expected
+    assert twitter_date_to_timestamp(date) == expected.timestamp()
+
+
+def test_change_format_converts_to_the_offset():
+    parsed = change_twitter_date_format(DATES[0], 2)
+    assert parsed.utcoffset() == datetime.timedelta(hours=2)
+    assert parsed.hour == 22
+
+
+def test_datetime64_batch_matches_single_parses():
+    result = twitter_dates_to_datetime64(DATES + [None])
+    expected = [np.datetime64(int(twitter_date_to_timestamp(date)), "s") for date in DATES]
+    assert list(result[:3]) == expected
+    assert np.isnat(result[3])
+
+
+def test_snowflake_timestamps():
+    tweet_id = 1_050_118_621_198_921_728 # Created Wed Oct 10 20:19:24.000 2018 UTC
+    assert snowflake_to_timestamp(tweet_id) == pytest.approx(twitter_date_to_timestamp(DATES[0]), abs=1)
+    assert snowflake_to_datetime(str(tweet_id)).year == 2018
+    assert snowflake_to_timestamp(20) is None # Older than snowflakes
+    result = snowflakes_to_datetime64([tweet_id, 20])
+    assert result[0].astype("datetime64[s]") == np.datetime64(int(snowflake_to_timestamp(tweet_id)), "s")
+    assert np.isnat(result[1])
@@ -1,60 +1,69 @@
-from utils import get_jsonpath_result
+from utils import LazyField, decode_lazy_fields, lazy_slots
 from user import User
 
+TWEET_FIELDS = (
+    "id", "user", "full_text", "created_at", "in_reply_to_status_id", "quoted_status_id", "retweet_status_id",
+    "favorite_count", "bookmark_count", "quote_count", "reply_count", "retweet_count", "view_count",
+    "entity_medias", "entity_hastags", "entity_urls", "entity_user_mentions",
+)
+
+
+def _entities(tweet: "Tweet", name: str, key: str) -> list[str]:
+    if tweet.typename != "Tweet":
+        return None
+    return [entity.get(key) for entity in (tweet._legacy.get("entities") or {}).get(name) or []]
+
+
 class Tweet:
-    tweet_dict: dict = None
+    """
+    A tweet decoded lazily from its `tweet_results.result` dict.
 
-    typename: str = None
+    Fields are decoded on first access, so the fields that are never read are
+    never decoded. With `keep_raw=False` every field is decoded up front and the
+    raw dict is dropped. Authors are shared through `User.intern`, so a timeline
+    keeps one User per author no matter how many tweets it has.
+    """
 
-    id: str = None
-    user: User = None
-    full_text: str = None
-    created_at: str = None
-    in_reply_to_status_id: str = None
-    quoted_status_id: str = None
-    retweet_status_id: str = None
+    __slots__ = ("_raw", "_legacy", "_keep_raw", "typename") + lazy_slots(*TWEET_FIELDS)
+
+    id: str = LazyField(lambda tweet: tweet._legacy.get("id_str") or None)
+    user: User = LazyField(lambda tweet: User.intern(tweet._raw["core"]["user_results"]["result"], tweet._keep_raw)
+                           if tweet.typename == "Tweet" else None)
+    full_text: str = LazyField(lambda tweet: tweet._legacy.get("full_text") or None)
+    created_at: str = LazyField(lambda tweet: tweet._legacy.get("created_at") or None)
+    in_reply_to_status_id: str = LazyField(lambda tweet: tweet._legacy.get("in_reply_to_status_id_str") or None)
+    quoted_status_id: str = LazyField(lambda tweet: tweet._legacy.get("quoted_status_id_str") or None)
+    retweet_status_id: str = LazyField(lambda tweet: tweet._legacy.get("retweet_status_id_str") or None)
 
     # Stats
-    favorite_count: int = None
-    bookmark_count: int = None
-    quote_count: int = None
-    reply_count: int = None
-    retweet_count: int = None
-    view_count: int = None
+    favorite_count: int = LazyField(lambda tweet: tweet._legacy.get("favorite_count") or None)
+    bookmark_count: int = LazyField(lambda tweet: tweet._legacy.get("bookmark_count") or None)
+    quote_count: int = LazyField(lambda tweet: tweet._legacy.get("quote_count") or None)
+    reply_count: int = LazyField(lambda tweet: tweet._legacy.get("reply_count") or None)
+    retweet_count: int = LazyField(lambda tweet: tweet._legacy.get("retweet_count") or None)
+    view_count: int = LazyField(lambda tweet: (tweet._raw.get("views") or {}).get("count") or None
+                                if tweet.typename == "Tweet" else None)
 
     # Entities
-    entity_medias: list[str] = None
-    entity_hastags: list[str] = None
-    entity_urls: list[str] = None
-    entity_user_mentions: list[str] = None
-
-    def __init__(self, tweet: dict):
-        self.tweet_dict = tweet
+    entity_medias: list[str] = LazyField(lambda tweet: _entities(tweet, "media", "media_url_https"))
+    entity_hastags: list[str] = LazyField(lambda tweet: _entities(tweet, "hashtags", "text"))
+    entity_urls: list[str] = LazyField(lambda tweet: _entities(tweet, "urls", "expanded_url"))
+    entity_user_mentions: list[str] = LazyField(lambda tweet: _entities(tweet, "user_mentions", "screen_name"))
 
+    def __init__(self, tweet: dict, keep_raw: bool = True):
+        self._raw = tweet
+        self._keep_raw = keep_raw
         self.typename = tweet.get("__typename")
-        if self.typename == "Tweet":
-            self.parse_tweet_from_dict(tweet)
-
-    def parse_tweet_from_dict(self, tweet: dict):
-        self.user = User(tweet.get("core").get("user_results").get("result"))
-        self.id = tweet.get("legacy").get("id_str") or None
-        self.full_text = tweet.get("legacy").get("full_text") or None
-        self.created_at = tweet.get("legacy").get("created_at") or None
-        self.in_reply_to_status_id = tweet.get("legacy").get("in_reply_to_status_id_str") or None
-        self.quoted_status_id = tweet.get("legacy").get("quoted_status_id_str") or None
-        self.retweet_status_id = tweet.get("legacy").get("retweet_status_id_str") or None
-
-        self.favorite_count = tweet.get("legacy").get("favorite_count") or None
-        self.bookmark_count = tweet.get("legacy").get("bookmark_count") or None
-        self.quote_count = tweet.get("legacy").get("quote_count") or None
-        self.reply_count = tweet.get("legacy").get("reply_count") or None
-        self.retweet_count = tweet.get("legacy").get("retweet_count") or None
-        self.view_count = tweet.get("views").get("count") or None    
-
-        self.entity_medias = [media.get("media_url_https") for media in tweet.get("legacy").get("entities").get("media") or []]
-        self.entity_hastags = [hastag.get("text") for hastag in tweet.get("legacy").get("entities").get("hashtags") or []]
-        self.entity_urls = [url.get("expanded_url") for url in tweet.get("legacy").get("entities").get("urls") or []]
-        self.entity_user_mentions = [user_mention.get("screen_name") for user_mention in tweet.get("legacy").get("entities").get("user_mentions") or []]
+        self._legacy = (tweet.get("legacy") or {}) if self.typename == "Tweet" else {}
+        if not keep_raw:
+            decode_lazy_fields(self, TWEET_FIELDS)
+            self._raw = None
+            self._legacy = None
+
+    @property
+    def tweet_dict(self) -> dict:
+        """The raw dict, or None when it was not kept."""
+        return self._raw
 
     def __repr__(self):
         base = "Tweet("
@@ -73,11 +82,11 @@ class Tweet:
         base += "reply_count=" + str(self.reply_count) + ","
         base += "retweet_count=" + str(self.retweet_count) + ","
         base += "view_count=" + str(self.view_count) + ","
-        
+
         base += "entity_medias=" + str(self.entity_medias) + ","
         base += "entity_hastags=" + str(self.entity_hastags) + ","
         base += "entity_urls=" + str(self.entity_urls) + ","
         base += "entity_user_mentions=" + str(self.entity_user_mentions)
 
         base += ")"
-        return base
\ No newline at end of file
+        return base
@@ -1,33 +1,64 @@
 from playwright.async_api import async_playwright, Playwright, BrowserContext, Page, Response, expect
 import logging
-from datetime import datetime
+from contextlib import asynccontextmanager, aclosing, suppress
+from typing import AsyncIterator, Callable, Coroutine
+from datetime import datetime, timedelta
 import urllib.parse
 import random
 import asyncio
-from utils import change_twitter_date_format, get_jsonpath_result
-import time
+import json
+import os
+from utils import ENTRY_CONTENTS, ITEM_TWEET_RESULTS, CLIENT_EVENT_COMPONENT, PROMOTED_METADATA, get_tweet_id
 from filters import TweetFilter
-import mpu.io
+from ratelimit import RateLimitGovernor
+from pool import PagePool
+from accounts import Account, AccountPool
+from network import NetworkFilter, NetworkProfile
+from buffer import ResponseBuffer
+from tweet import Tweet
+from graphql_request import CapturedRequest, request_variables, find_cursors
+from records import PageRecord, BatchResult
+from state import SyncStateStore, open_sync_state
+from checkpoint import Checkpoint
+from cache import ResponseCache
+from replay import ResponseRecorder
+from metrics import ScrapeMetrics
+from conversation import ConversationTree
+from sinks import Sink
+
+# Cursors that continue a TweetDetail conversation: more top-level replies, more of a thread
+# and the replies hidden behind "Show more replies" / "Show probable spam"
+CONVERSATION_CURSORS = ("Bottom", "ShowMore", "ShowMoreThreads", "ShowMoreThreadsPrompt")
+# Cursors that load more top-level replies ("Show more replies", "Show probable spam"), as opposed
+# to ShowMore, which expands the replies inside a thread
+TOP_LEVEL_CURSORS = ("Bottom", "ShowMoreThreads", "ShowMoreThreadsPrompt")
+
 
 class TwitterApi:
 
     # Playwright objects
     playwright: Playwright
     context: BrowserContext
-    page: Page
+    pages: PagePool
+    network: NetworkFilter
 
     # Twitter API objects
-    __x_rate_limit_limit = 0
-    __x_rate_limit_remaining = 0
-    __x_rate_limit_reset = 0
+    accounts: AccountPool
+    metrics: ScrapeMetrics
 
     # Settings
     delay: tuple[int, int] = (7, 10)
     responses_wait_count: int = 10
     responses_wait_sec: int = 60
     rate_limit_stop = 5
-
-    __halt_session: bool = False
+    max_pages: int = 4
+    direct_pagination: bool = False
+    sync_state: SyncStateStore = None
+    checkpoint_dir: str = None
+    checkpoint_flush_every: int = 1
+    response_cache: ResponseCache = None
+    recorder: ResponseRecorder = None
+    default_timeout: float = None
 
     def __init__(self, logging_level: int = logging.WARN, logger_name: str = None):
         """
@@ -41,11 +72,15 @@ class TwitterApi:
         if logger_name is None:
             logger_name = __name__
         self.__create_logger(logger_name, logging_level)
+        self.accounts = AccountPool()
+        self.metrics = ScrapeMetrics()
         
     def __create_logger(self, name: str, level: int = logging.DEBUG):
-        """Create a logger for the class."""
-        self.logger: logging.Logger = logging.getLogger("asyncio")
+        """Create a logger for the class. The handler is only added once per logger name."""
+        self.logger: logging.Logger = logging.getLogger(name)
         self.logger.setLevel(level)
+        if self.logger.handlers:
+            return
         handler = logging.StreamHandler()
         formatter = logging.Formatter(
             "[%(asctime)s] %(levelname)s: %(message)s"
@@ -55,156 +90,555 @@ class TwitterApi:
 
     async def create_client(
         self, 
-        auth_token: str, 
-        ct0: str,
+        auth_token: str = None, 
+        ct0: str = None,
         headless: bool = False,
+        max_pages: int = None,
+        network_profile: str | NetworkProfile = "full",
+        user_data_dir: str = None,
+        storage_state: str | dict = None,
+        cdp_url: str = None,
     ):
+        """
+        Launch the browser and log in with the given cookies. More accounts can
+        be added afterwards with `add_account`.
+
+        A warm session skips most of the first page load: `user_data_dir` keeps
+        cookies, local storage and the HTTP cache across runs, `storage_state` restores
+        the cookies and local storage saved by `save_storage_state`, and `cdp_url`
+        attaches to a browser that is already running. The cookies can be left out
+        when the session is already logged in.
+
+        Args:
+            auth_token (str): The auth_token cookie.
+            ct0 (str): The ct0 cookie.
+            headless (bool): Run the browser without a window.
+            max_pages (int): How many pages may scrape concurrently. Defaults to `max_pages`.
+            network_profile (str | NetworkProfile): Which resources pages may load. "minimal" only
+                lets through what the timeline needs, "balanced" drops media, fonts and trackers,
+                "full" loads everything.
+            user_data_dir (str): Run in a persistent browser profile in this directory.
+            storage_state (str | dict): A storage state, or the path of one. A missing file is
+                ignored, so the same path can be used for the first run. Cannot be combined with
+                `user_data_dir` or `cdp_url`, whose context already has its own state.
+            cdp_url (str): Connect over CDP to a running Chromium, e.g. "http://localhost:9222",
+                and reuse its first context.
+        """
+        if storage_state is not None and (user_data_dir is not None or cdp_url is not None):
+            raise ValueError("storage_state cannot be combined with user_data_dir or cdp_url")
+        if max_pages is not None:
+            self.max_pages = max_pages
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=headless)
-        self.context = await self.browser.new_context()
-        await self.context.add_cookies([
-            {"name": "auth_token", "value": auth_token, "domain": "twitter.com", "path": "/"},
-            {"name": "ct0", "value": ct0, "domain": "twitter.com", "path": "/"}])
+        self.network = NetworkFilter(network_profile)
+        context = None
+        if cdp_url is not None:
+            self.browser = await self.playwright.chromium.connect_over_cdp(cdp_url)
+            context = self.browser.contexts[0] if self.browser.contexts else None
+        elif user_data_dir is not None:
+            context = await self.playwright.chromium.launch_persistent_context(user_data_dir, headless=headless)
+            self.browser = context.browser
+        else:
+            self.browser = await self.playwright.chromium.launch(headless=headless)
+        account = await self.add_account(auth_token, ct0, context=context, storage_state=storage_state)
+        account.owns_context = cdp_url is None or context is None
+        self.context = account.context
+        self.pages = account.pages
         self.logger.info("Created Twitter API Client")
 
-    async def __create_page(self):
-        if getattr(self, "page", None) is not None:
-            await self.page.close()
-        self.page = await self.context.new_page()
-            
+    async def add_account(
+        self,
+        auth_token: str = None,
+        ct0: str = None,
+        name: str = None,
+        context: BrowserContext = None,
+        storage_state: str | dict = None,
+    ) -> Account:
+        """
+        Log in another account in its own BrowserContext. Requests are spread over
+        the accounts by their remaining rate limit budget.
+
+        Args:
+            auth_token (str): The auth_token cookie. Can be left out when the context is logged in.
+            ct0 (str): The ct0 cookie. Read from the context when left out.
+            name (str): A name for the account in logs. Defaults to its position in the pool.
+            context (BrowserContext): Use this context instead of creating one.
+            storage_state (str | dict): Create the context from this storage state, or the path of one.
+        """
+        if context is not None and storage_state is not None:
+            raise ValueError("storage_state only applies to a context created by add_account")
+        if context is None:
+            if self.browser is None:
+                raise ValueError("A client in a persistent profile (user_data_dir) has a single context, "
+                                 "create it without user_data_dir to add more accounts")
+            if isinstance(storage_state, str) and not os.path.exists(storage_state):
+                storage_state = None
+            context = await self.browser.new_context(storage_state=storage_state)
+        if self.default_timeout is not None:
+            context.set_default_timeout(self.default_timeout)
+        cookies = []
+        if auth_token is not None:
+            cookies.append({"name": "auth_token", "value": auth_token, "domain": "twitter.com", "path": "/"})
+        if ct0 is not None:
+            cookies.append({"name": "ct0", "value": ct0, "domain": "twitter.com", "path": "/"})
+        if cookies:
+            await context.add_cookies(cookies)
+        if ct0 is None:
+            ct0 = next((cookie["value"] for cookie in await context.cookies("https://twitter.com")
+                        if cookie["name"] == "ct0"), None)
+        account = Account(name or f"account{len(self.accounts)}", auth_token, ct0, context,
+                          PagePool(context, self.max_pages, self.network))
+        self.accounts.add(account)
+        self.logger.info(f"Added account {account.name}")
+        return account
+
+    @asynccontextmanager
+    async def __intercepted_page(self, type: str, responses: ResponseBuffer):
+        """
+        Borrow a page from the account with the most headroom for `type`. The page
+        collects the `type` responses into `responses`.
+        """
+        async with self.accounts.acquire(type) as account, account.pages.page() as page:
+            responses.account = account
+            responses.rate_limit = account.get_rate_limit(type)
+            responses.network = self.network.reset(page)
+            interceptor = await self.__create_interceptor_function(type, responses)
+            page.on("response", interceptor)
+            try:
+                yield page
+            finally:
+                page.remove_listener("response", interceptor)
+                self.logger.debug(f"{type} network: {responses.network.allowed_requests} requests allowed ({responses.network.allowed_bytes} bytes), {responses.network.blocked_requests} blocked {responses.network.blocked_by_type}")
+
+    async def save_storage_state(self, path: str, account: Account = None):
+        """Save the cookies and local storage of an account, the first one by default, for `storage_state`."""
+        await (account or self.accounts.primary).context.storage_state(path=path)
+
     def set_default_timeout(self, timeout = 3000):
-        self.context.set_default_timeout(timeout)
+        self.default_timeout = timeout
+        for account in self.accounts:
+            account.context.set_default_timeout(timeout)
 
     def set_delay(self, delay: tuple[int, int]):
         self.delay = delay
 
-    async def __create_interceptor_function(self, type: str, responses: list[Response]):
+    def set_direct_pagination(self, enabled: bool = True):
+        """
+        Fetch pages after the first one by replaying the captured GraphQL request
+        with the next cursor instead of scrolling the rendered timeline.
+        """
+        self.direct_pagination = enabled
+
+    def set_response_cache(self, cache: ResponseCache | str = None, ttl: float = 300, max_entries: int = 1024):
+        """
+        Serve user lookups, tweet details and directly paginated timeline pages from a
+        cache while they are fresh.
+
+        Args:
+            cache (ResponseCache | str): A cache, or the path of a SQLite file backing a new one.
+                An in-memory cache by default.
+            ttl (float): How long new entries stay fresh, in seconds.
+            max_entries (int): How many entries the in-memory LRU keeps.
+        """
+        if not isinstance(cache, ResponseCache):
+            cache = ResponseCache(ttl, max_entries, cache)
+        self.response_cache = cache
+
+    def set_recorder(self, recorder: ResponseRecorder | str = None):
+        """
+        Save every GraphQL response body the scrapers receive, e.g. to replay them offline
+        with a `ReplayServer`. Accepts a recorder or a directory; None stops recording.
+        """
+        self.recorder = ResponseRecorder(recorder) if isinstance(recorder, str) else recorder
+
+    def set_metrics_callback(self, callback):
+        """
+        Call `callback(kind, name, value)` on every stage timing ("stage", seconds) and
+        counter increment ("counter", amount). See `metrics` for the totals and
+        `metrics.to_prometheus()` for a Prometheus text export.
+        """
+        self.metrics.add_callback(callback)
+
+    def get_rate_limit(self, type: str, account: Account = None) -> RateLimitGovernor:
+        """Get the rate limit governor of a GraphQL operation (e.g. "UserTweets") of an account, the first one by default."""
+        return (account or self.accounts.primary).get_rate_limit(type)
+
+    async def __handle_rate_limit(self, rate_limit: RateLimitGovernor, headers: dict, ok: bool = True):
+        state = await rate_limit.update(headers)
+        if not ok:
+            return
+        self.logger.debug(f"Rate limit remaining: {state.remaining}; Rate limit limit: {state.limit}; Next refresh: {datetime.fromtimestamp(state.reset).strftime('%H:%M:%S')}")
+        if state.used > 0 and state.used % self.responses_wait_count == 0:
+            self.logger.info(f"Rate limit remaining: {state.remaining}, waiting for {self.responses_wait_sec} seconds")
+            rate_limit.pause(self.responses_wait_sec)
+        if state.remaining <= self.rate_limit_stop:
+            strtime = datetime.fromtimestamp(state.reset + 30).strftime('%H:%M:%S')
+            self.logger.warning(f"Rate limit reached! Waiting for reset... (ETA: {strtime})")
+            rate_limit.pause_until(state.reset + 30)
+
+    async def __wait_rate_limit(self, rate_limit: RateLimitGovernor):
+        if rate_limit.paused:
+            self.metrics.increment("rate_limit_waits")
+        with self.metrics.time("rate_limit_wait"):
+            await rate_limit.wait()
+
+    def __decode_page(self, operation: str, url: str, body: bytes, request=None) -> PageRecord:
+        """Decode a GraphQL response body once, record it if recording and extract its page."""
+        with self.metrics.time("json_decode"):
+            data = json.loads(body)
+        if self.recorder is not None:
+            self.recorder.save(operation, url, data)
+        with self.metrics.time("extraction"):
+            record = PageRecord.from_json(operation, data, request)
+        self.metrics.increment("pages")
+        self.metrics.increment("tweets", len(record.tweets))
+        self.metrics.increment("bytes", len(body))
+        return record
+
+    async def __create_interceptor_function(self, type: str, responses: ResponseBuffer):
+        rate_limit = responses.rate_limit
         async def interceptor(response: Response):
             if response.request.resource_type == "xhr" and type in response.url:
-                self.__x_rate_limit_remaining = int(response.headers.get("x-rate-limit-remaining"))
-                self.__x_rate_limit_reset = int(response.headers.get("x-rate-limit-reset"))
-                self.__x_rate_limit_limit = int(response.headers.get("x-rate-limit-limit"))
-                if response.ok:
-                    self.logger.debug(f"Rate limit remaining: {self.__x_rate_limit_remaining}; Rate limit limit: {self.__x_rate_limit_limit}; Next refresh: {datetime.fromtimestamp(self.__x_rate_limit_reset).strftime('%H:%M:%S')}")
-                    if (self.__x_rate_limit_limit - self.__x_rate_limit_remaining > 0 
-                    and (self.__x_rate_limit_limit - self.__x_rate_limit_remaining) % self.responses_wait_count == 0):
-                        self.logger.info(f"Rate limit remaining: {self.__x_rate_limit_remaining}, waiting for {self.responses_wait_sec} seconds")
-                        self.__halt_session = True
-                        time.sleep(self.responses_wait_sec)
-                        self.__halt_session = False
-                    if self.__x_rate_limit_remaining <= self.rate_limit_stop:
-                        strtime = datetime.fromtimestamp(self.__x_rate_limit_reset + 30).strftime('%H:%M:%S')
-                        self.logger.warning(f"Rate limit reached! Waiting for reset... (ETA: {strtime})")
-                        self.__halt_session = True
-                        time.sleep(self.__x_rate_limit_reset - time.time() + 30)
-                        self.__halt_session = False
-
-                    responses.append(response)
-                    self.logger.debug(f"Caught a response! Response now is {len(responses)}")
-                    # print(responses)
+                with self.metrics.time("interceptor"):
+                    await self.__handle_rate_limit(rate_limit, response.headers, response.ok)
+                    if response.ok:
+                        record = self.__decode_page(type, response.url, await response.body(), response.request)
+                        responses.append(record)
+                        responses.json_decodes += 1
+                        if self.response_cache is not None and record.entries:
+                            self.response_cache.set(type, request_variables(response.url),
+                                                    {"entries": record.entries, "module_items": record.module_items})
+                        if responses.checkpoint is not None and responses.captured is None:
+                            responses.captured = await CapturedRequest.from_request(response.request)
+                            responses.checkpoint.save_request(responses.captured)
+                        self.logger.debug(f"Caught a response! Response now is {len(responses)}")
             return response
         return interceptor
 
     async def __scroll(
         self,
+        page: Page,
     ):
-        await self.page.evaluate_handle("window.scrollTo({top: document.body.scrollHeight, behavior: 'smooth'})")
-        await asyncio.sleep(random.randint(self.delay[0], self.delay[1]))
+        with self.metrics.time("scroll"):
+            await page.evaluate_handle("window.scrollTo({top: document.body.scrollHeight, behavior: 'smooth'})")
+        with self.metrics.time("delay"):
+            await asyncio.sleep(random.randint(self.delay[0], self.delay[1]))
 
-    async def __wait_for_spinners(self):
-        locator = self.page.get_by_role("progressbar")
-        spinner_cnt = await locator.count()
-        if spinner_cnt > 0:
-            self.logger.debug(f"Found {spinner_cnt} spinners. Waiting for spinners to not be present")
-        await expect(locator).to_have_count(0, timeout=120_000)
+    async def __wait_for_spinners(self, page: Page):
+        with self.metrics.time("spinners"):
+            locator = page.get_by_role("progressbar")
+            spinner_cnt = await locator.count()
+            if spinner_cnt > 0:
+                self.logger.debug(f"Found {spinner_cnt} spinners. Waiting for spinners to not be present")
+            await expect(locator).to_have_count(0, timeout=120_000)
 
-    async def __click_show_replies(self):
+    async def __click_show_replies(self, page: Page):
         while True:
-            show_replies_button = self.page.get_by_role("button", name="Show replies")
+            show_replies_button = page.get_by_role("button", name="Show replies")
             if await show_replies_button.count() == 0: return
             for button in await show_replies_button.all(): 
                 await button.click()
             await asyncio.sleep(5)
-            await self.__wait_for_spinners()
+            await self.__wait_for_spinners(page)
 
-    async def __click_show_additional_replies(self):
+    async def __click_show_additional_replies(self, page: Page):
         while True:
-            show_additional_replies_button = self.page.get_by_role("button", name="Show")
+            show_additional_replies_button = page.get_by_role("button", name="Show")
             if await show_additional_replies_button.count() == 0: return
             for button in await show_additional_replies_button.all(): 
                 await button.click()
             await asyncio.sleep(5)
-            await self.__wait_for_spinners()
+            await self.__wait_for_spinners(page)
+
+    async def __reached_limit(
+        self,
+        responses: ResponseBuffer,
+        **kwargs,
+    ) -> bool:
+        # Termination by high-water mark
+        if kwargs.get("since_id") is not None and responses.last and responses.last.max_id is not None \
+                and responses.last.max_id <= kwargs.get("since_id"):
+            self.logger.info("Scrolling terminated because the last synced tweet is reached!")
+            responses.stop_reason = "since_id"
+            return True
+        # Termination by date
+        if kwargs.get("start_date") and kwargs.get("end_date") and responses.last:
+            newest = responses.last.max_created_at
+            if newest is None or newest < kwargs.get("start_date"):
+                self.logger.info("Scrolling terminated because date range is reached!")
+                responses.stop_reason = "date"
+                return True
+        # Termination by pages
+        if kwargs.get("pages") and len(responses) >= kwargs.get("pages"):
+            self.logger.info("Scrolling terminated because page limit is reached!")
+            responses.stop_reason = "pages"
+            return True
+        return False
+
+    async def __fetch_directly(self, captured: CapturedRequest, url: str) -> PageRecord:
+        """
+        Call `captured`'s operation at `url` through the APIRequestContext of the account with
+        the most headroom, with that account's csrf token. None when the request failed.
+        """
+        async with self.accounts.acquire(captured.operation) as account:
+            rate_limit = account.get_rate_limit(captured.operation)
+            await self.__wait_rate_limit(rate_limit) # Suspend this request while its endpoint is rate limited
+            headers = {**captured.headers, "x-csrf-token": account.ct0}
+            with self.metrics.time("request"):
+                response = await account.request.get(url, headers=headers)
+                body = await response.body()
+            await self.__handle_rate_limit(rate_limit, response.headers, response.ok)
+        if not response.ok:
+            self.logger.warning(f"{captured.operation} request failed with status {response.status}")
+            return None
+        return self.__decode_page(captured.operation, url, body)
+
+    async def __paginate_directly(
+        self,
+        responses: ResponseBuffer,
+        **kwargs,
+    ):
+        """
+        Fetch the next pages by replaying the first captured GraphQL request with
+        the next cursor through an APIRequestContext, without scrolling. Every page
+        goes to the account with the most headroom, with that account's csrf token.
+        """
+        if not responses.first:
+            self.logger.warning("No GraphQL response was captured, cannot paginate directly")
+            return
+        if responses.captured is None:
+            responses.captured = await CapturedRequest.from_request(responses.first.request)
+        captured = responses.captured
+        seen_cursors = set()
+        while not await self.__reached_limit(responses, **kwargs):
+            cursor = responses.last.cursor
+            if cursor is None or cursor in seen_cursors:
+                self.logger.info("Pagination terminated because there is no next cursor!")
+                responses.stop_reason = "end"
+                break
+            seen_cursors.add(cursor)
+
+            variables = {**captured.variables, "cursor": cursor}
+            cached = self.response_cache.get(captured.operation, variables) if self.response_cache is not None else None
+            if cached is not None:
+                self.logger.debug(f"Serving a {captured.operation} page from the cache")
+                record = PageRecord.from_entries(captured.operation, cached["entries"], cached["module_items"])
+            else:
+                record = await self.__fetch_directly(captured, captured.url_for(cursor))
+                if record is None:
+                    break
+                responses.json_decodes += 1
+                if self.response_cache is not None and record.entries:
+                    self.response_cache.set(captured.operation, variables,
+                                            {"entries": record.entries, "module_items": record.module_items})
+            if not record.tweets:
+                self.logger.info("Pagination terminated because the timeline has no more tweets!")
+                responses.stop_reason = "end"
+                break
+            responses.append(record)
+            self.logger.debug(f"Fetched a page directly! Response now is {len(responses)}")
 
     async def __infinite_scroll(
         self,
-        responses = list[Response],
+        page: Page,
+        responses: ResponseBuffer,
+        rate_limit: RateLimitGovernor,
         **kwargs,
     ):
         prevScrollHeight = 0
-        currScrollHeight = await self.page.evaluate("document.body.scrollHeight")
+        currScrollHeight = await page.evaluate("document.body.scrollHeight")
         while True:
-            if self.__halt_session:
-                continue
+            await self.__wait_rate_limit(rate_limit) # Suspend this scrape while its endpoint is rate limited
 
             if kwargs.get("click_replies"): # Press all pressable show replies buttons
-                await self.__click_show_replies()
+                with self.metrics.time("click_show_replies"):
+                    await self.__click_show_replies(page)
 
             if kwargs.get("click_additional_replies"): # Press all pressable show buttons
-                await self.__click_show_additional_replies()
+                with self.metrics.time("click_show_additional_replies"):
+                    await self.__click_show_additional_replies(page)
 
-            await self.__wait_for_spinners() # Wait for spinners to not be present
+            await self.__wait_for_spinners(page) # Wait for spinners to not be present
 
-            # Termination by date
-            if kwargs.get("start_date") and kwargs.get("end_date"):
-                tweet_dates = [change_twitter_date_format(date) for date in get_jsonpath_result(await responses[-1].json(), "$..entries..itemContent.tweet_results.result.legacy.created_at")]
-                if all([x < kwargs.get("start_date") for x in tweet_dates]):
-                    self.logger.info("Scrolling terminated because date range is reached!")
-                    break
-            # Termination by pages
-            if kwargs.get("pages") and len(responses) >= kwargs.get("pages"):
-                self.logger.info("Scrolling terminated because page limit is reached!")
+            if await self.__reached_limit(responses, **kwargs):
                 break
             # Termination by being unable to scroll
             if currScrollHeight == prevScrollHeight:
                 self.logger.info("Scrolling terminated because scrolling is not possible!")
+                responses.stop_reason = "end"
                 break
-            await self.__scroll()
+            await self.__scroll(page)
             prevScrollHeight = currScrollHeight
-            currScrollHeight = await self.page.evaluate("document.body.scrollHeight")
+            currScrollHeight = await page.evaluate("document.body.scrollHeight")
 
 
+    def set_sync_state(self, store: SyncStateStore | str):
+        """
+        Set where incremental scrapes keep the newest tweet id and cursor of each
+        handle or query. Accepts a store or a path (.json for a JSON file, SQLite otherwise).
+        """
+        self.sync_state = open_sync_state(store) if isinstance(store, str) else store
+
+    def __get_since_id(self, key: str) -> int:
+        if self.sync_state is None:
+            raise ValueError("Incremental scraping needs a sync state store, call set_sync_state first")
+        since_id = self.sync_state.get(key).newest_id
+        self.logger.info(f"Syncing {key} from tweet {since_id}" if since_id else f"First sync of {key}")
+        return since_id
+
+    def __save_sync_state(self, key: str, buffer: ResponseBuffer, since_id: int, newest_id: int):
+        """Move the high-water mark of `key` forward, unless the scrape stopped before reaching the old one."""
+        if since_id is not None and buffer.stop_reason not in ("since_id", "end"):
+            self.logger.warning(f"Not updating sync state of {key}: scrape stopped by {buffer.stop_reason}")
+            return
+        if newest_id is None:
+            return
+        self.sync_state.set(key, newest_id, buffer.first.top_cursor if buffer.first else None)
+
+    def set_checkpoint_dir(self, path: str, flush_every: int = 1):
+        """
+        Set the directory where scrapes started with `checkpoint=True` log their pages.
+
+        Args:
+            path (str): The checkpoint directory, created when missing.
+            flush_every (int): Sync the log to disk after this many pages.
+        """
+        self.checkpoint_dir = path
+        self.checkpoint_flush_every = flush_every
+
+    def __open_checkpoint(self, key: str, buffer: ResponseBuffer):
+        """
+        Attach the checkpoint of `key` to `buffer`. When an unfinished scrape of `key`
+        was logged, its pages are replayed into `buffer` first.
+        """
+        if self.checkpoint_dir is None:
+            raise ValueError("Checkpointing needs a checkpoint directory, call set_checkpoint_dir first")
+        checkpoint = Checkpoint.open(self.checkpoint_dir, key, self.checkpoint_flush_every)
+        if checkpoint.resumable:
+            self.logger.info(f"Resuming {key} after {len(checkpoint.pages)} checkpointed pages")
+            buffer.captured = checkpoint.request
+            buffer.replay(checkpoint.pages)
+        buffer.checkpoint = checkpoint
+
+    async def __stream(
+        self,
+        producer: Coroutine,
+        buffer: ResponseBuffer,
+    ) -> AsyncIterator[PageRecord]:
+        """
+        Run `producer` in the background and yield its pages as they arrive.
+
+        The checkpoint of `buffer`, if any, is removed once the scrape ran to its end
+        or the consumer had enough tweets, and kept for a resume otherwise.
+        """
+        task = asyncio.create_task(producer)
+        finished = False
+        try:
+            async for record in buffer:
+                yield record
+            await task
+            finished = True
+            self.logger.debug(f"Decoded {buffer.json_decodes} JSON bodies for {len(buffer)} pages")
+        finally:
+            if not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+            if buffer.checkpoint is not None:
+                if finished or buffer.stop_reason == "count":
+                    buffer.checkpoint.complete()
+                else:
+                    buffer.checkpoint.close()
+
     async def __get_user_tweets_responses(
         self,
         url: str,
+        user_tweets_responses: ResponseBuffer,
         **kwargs,
     ):
-        user_tweets_responses: list[Response] = []
-        
-        await self.__create_page()
-        self.page.on("response", await self.__create_interceptor_function("UserTweets", user_tweets_responses))
-        await self.page.goto(url)
-        await self.page.wait_for_selector("[data-testid='tweet']")
-        await self.__infinite_scroll(user_tweets_responses, delay=kwargs.get("delay"), 
-                            start_date=kwargs.get("start_date"), end_date=kwargs.get("end_date"), 
-                            pages=kwargs.get("pages"))
-        return user_tweets_responses
+        try:
+            if user_tweets_responses.resuming:
+                await self.__paginate_directly(user_tweets_responses,
+                                    start_date=kwargs.get("start_date"), end_date=kwargs.get("end_date"), 
+                                    pages=kwargs.get("pages"), since_id=kwargs.get("since_id"))
+                return
+            async with self.__intercepted_page("UserTweets", user_tweets_responses) as page:
+                with self.metrics.time("goto"):
+                    await page.goto(url)
+                await page.wait_for_selector("[data-testid='tweet']")
+                if not self.direct_pagination:
+                    await self.__infinite_scroll(page, user_tweets_responses, user_tweets_responses.rate_limit, delay=kwargs.get("delay"), 
+                                        start_date=kwargs.get("start_date"), end_date=kwargs.get("end_date"), 
+                                        pages=kwargs.get("pages"), since_id=kwargs.get("since_id"))
+            if self.direct_pagination:
+                await self.__paginate_directly(user_tweets_responses,
+                                    start_date=kwargs.get("start_date"), end_date=kwargs.get("end_date"), 
+                                    pages=kwargs.get("pages"), since_id=kwargs.get("since_id"))
+        finally:
+            user_tweets_responses.close()
 
-    async def get_user_tweets(
+    async def iter_user_tweets(
         self,
         handle: str,
         pages: int = None,
         count: int = None,
-    ) -> list[dict]:
+        as_tweet: bool = False,
+        incremental: bool = False,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> AsyncIterator[dict | Tweet]:
+        """
+        Yield the tweets of a user as each timeline page arrives. Replies are left out.
+
+        Args:
+            handle (str): The user's handle, without the @.
+            pages (int): Stop after this many timeline pages.
+            count (int): Stop after this many tweets.
+            as_tweet (bool): Yield `Tweet` objects instead of raw dicts.
+            incremental (bool): Only yield tweets newer than the last sync of this handle and
+                stop scrolling once they are all seen. Needs `set_sync_state`.
+            checkpoint (bool): Log every page to disk and, after a crash, resume from the
+                last logged cursor. Needs `set_checkpoint_dir`.
+            sink (Sink): Also write every yielded tweet, as a raw dict, to this sink. The caller closes it.
+        """
         url = f"https://twitter.com/{handle}"
         self.logger.info("Start getting user tweets from Twitter")
-        responses = await self.__get_user_tweets_responses(url, pages=pages)
-        tweets: list[dict] = []
-        for response in responses:
-            tweets.extend(get_jsonpath_result( await response.json(), "$..entries..itemContent.tweet_results.result" ))
-        tweets = TweetFilter.remove_replies(tweets)
-        if count: TweetFilter.filter_by_count(tweets, count)
+        sync_key = f"user:{handle.lower()}"
+        since_id = self.__get_since_id(sync_key) if incremental else None
+        buffer = ResponseBuffer()
+        if checkpoint:
+            self.__open_checkpoint(sync_key, buffer)
+        yielded = 0
+        newest_id = None
+        async with aclosing(self.__stream(self.__get_user_tweets_responses(url, buffer, pages=pages, since_id=since_id), buffer)) as responses:
+            async for record in responses:
+                for tweet in TweetFilter.remove_replies(record.tweets):
+                    tweet_id = int(get_tweet_id(tweet) or 0)
+                    if since_id is not None and tweet_id <= since_id:
+                        continue
+                    newest_id = max(newest_id or 0, tweet_id)
+                    if sink is not None:
+                        await sink.append_async(tweet)
+                    yield Tweet(tweet) if as_tweet else tweet
+                    yielded += 1
+                    if count and yielded >= count:
+                        buffer.stop_reason = "count"
+                        break
+                if buffer.stop_reason == "count":
+                    break # Fall through so a first sync still saves its high-water mark
+        if incremental:
+            self.__save_sync_state(sync_key, buffer, since_id, newest_id)
 
+    async def get_user_tweets(
+        self,
+        handle: str,
+        pages: int = None,
+        count: int = None,
+        incremental: bool = False,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> list[dict]:
+        tweets = [tweet async for tweet in self.iter_user_tweets(handle, pages=pages, count=count, incremental=incremental,
+                                                                 checkpoint=checkpoint, sink=sink)]
         self.logger.info(f"Finish getting user tweets. Got {len(tweets)} tweets")
         return tweets        
 
@@ -212,149 +646,610 @@ class TwitterApi:
     async def __get_search_timeline_responses(
         self,
         url: str,
+        search_timeline_responses: ResponseBuffer,
         **kwargs,
-    ) -> list[Response]: 
-        search_timeline_responses: list[Response] = []
-        
-        await self.__create_page()
-        self.page.on("response", await self.__create_interceptor_function("SearchTimeline", search_timeline_responses))
-        await self.page.goto(url)
-        await self.page.wait_for_selector("[data-testid='tweet']")
-        await self.__infinite_scroll(search_timeline_responses, pages=kwargs.get("pages"))
-        return search_timeline_responses
+    ): 
+        try:
+            if search_timeline_responses.resuming:
+                await self.__paginate_directly(search_timeline_responses, pages=kwargs.get("pages"), since_id=kwargs.get("since_id"))
+                return
+            async with self.__intercepted_page("SearchTimeline", search_timeline_responses) as page:
+                with self.metrics.time("goto"):
+                    await page.goto(url)
+                await page.wait_for_selector("[data-testid='tweet']")
+                if not self.direct_pagination:
+                    await self.__infinite_scroll(page, search_timeline_responses, search_timeline_responses.rate_limit,
+                                                 pages=kwargs.get("pages"), since_id=kwargs.get("since_id"))
+            if self.direct_pagination:
+                await self.__paginate_directly(search_timeline_responses, pages=kwargs.get("pages"), since_id=kwargs.get("since_id"))
+        finally:
+            search_timeline_responses.close()
 
-    async def get_search_timeline(
+    def __search_url(
         self,
         query: str = "",
         from_username: str = None,
         until: datetime = None,
         since: datetime = None,
         replies: bool = True,
-        pages: int = None,
-    ) -> list[dict]:
+    ) -> str:
         url = f"https://twitter.com/search?q={query} "
         if from_username: url += f"(from:{from_username}) "
         if until: url += f"until:{until.strftime('%Y-%m-%d')} "
         if since: url += f"since:{since.strftime('%Y-%m-%d')} "
         if not replies: url += f"-filter:replies "
         url += ")"
+        return url
 
+    async def iter_search_timeline(
+        self,
+        query: str = "",
+        from_username: str = None,
+        until: datetime = None,
+        since: datetime = None,
+        replies: bool = True,
+        pages: int = None,
+        as_tweet: bool = False,
+        incremental: bool = False,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> AsyncIterator[dict | Tweet]:
+        """
+        Yield the tweets of a search as each timeline page arrives. See `get_search_timeline`.
+
+        With `incremental`, the search runs on the chronological "Latest" tab, only
+        tweets newer than the last sync of the same search are yielded and scrolling
+        stops once they are all seen. Needs `set_sync_state`.
+
+        With `checkpoint`, every page is logged to disk and a crashed search resumes
+        from its last logged cursor. Needs `set_checkpoint_dir`.
+
+        With `sink`, every yielded tweet is also written to it as a raw dict. The caller closes it.
+        """
+        url = self.__search_url(query, from_username, until, since, replies)
+        sync_key = f"search:{url}"
+        since_id = self.__get_since_id(sync_key) if incremental else None
+        if incremental:
+            url += "&f=live"
         self.logger.info(f"Start getting search timeline tweets from Twitter: {url}")
 
-        tweets: list[dict] = []
-        responses = await self.__get_search_timeline_responses(url, pages=pages)
-        for response in responses:
-            tweets.extend(get_jsonpath_result( await response.json(), "$..entries..itemContent.tweet_results.result" ))
+        buffer = ResponseBuffer()
+        if checkpoint:
+            self.__open_checkpoint(sync_key, buffer)
+        newest_id = None
+        async with aclosing(self.__stream(self.__get_search_timeline_responses(url, buffer, pages=pages, since_id=since_id), buffer)) as responses:
+            async for record in responses:
+                for tweet in record.tweets:
+                    tweet_id = int(get_tweet_id(tweet) or 0)
+                    if since_id is not None and tweet_id <= since_id:
+                        continue
+                    newest_id = max(newest_id or 0, tweet_id)
+                    if sink is not None:
+                        await sink.append_async(tweet)
+                    yield Tweet(tweet) if as_tweet else tweet
+        if incremental:
+            self.__save_sync_state(sync_key, buffer, since_id, newest_id)
 
+    async def get_search_timeline(
+        self,
+        query: str = "",
+        from_username: str = None,
+        until: datetime = None,
+        since: datetime = None,
+        replies: bool = True,
+        pages: int = None,
+        incremental: bool = False,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> list[dict]:
+        tweets = [tweet async for tweet in self.iter_search_timeline(query, from_username, until, since, replies, pages,
+                                                                     incremental=incremental, checkpoint=checkpoint, sink=sink)]
         self.logger.info(f"Finish getting search timeline tweets. Got {len(tweets)} tweets")
 
         return tweets
 
 
+    async def __search_window(
+        self,
+        url: str,
+        pages: int = None,
+        checkpoint: bool = False,
+    ) -> tuple[list[dict], int]:
+        """Scrape one search and return its tweets and how many pages it took."""
+        buffer = ResponseBuffer()
+        if checkpoint:
+            self.__open_checkpoint(f"search:{url}", buffer)
+        tweets: list[dict] = []
+        async with aclosing(self.__stream(self.__get_search_timeline_responses(url, buffer, pages=pages), buffer)) as responses:
+            async for record in responses:
+                tweets.extend(record.tweets)
+        return tweets, len(buffer)
+
+    async def harvest_search_range(
+        self,
+        query: str = "",
+        from_username: str = None,
+        since: datetime = None,
+        until: datetime = None,
+        replies: bool = True,
+        window_days: int = 10,
+        pages: int = None,
+        concurrency: int = None,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> list[dict]:
+        """
+        Get every tweet of a search between `since` and `until` by splitting the range
+        into date windows that are scraped concurrently.
+
+        A window that reaches the `pages` limit probably has more tweets than it got,
+        so it is split in half and each half is scraped again, down to one day.
+        The results are merged and deduplicated by tweet id, newest first.
+
+        Args:
+            query (str): The search query.
+            from_username (str): Only tweets from this user.
+            since (datetime): Start of the range, inclusive.
+            until (datetime): End of the range, exclusive.
+            replies (bool): Include replies.
+            window_days (int): Length of the initial windows in days.
+            pages (int): Page limit of each window. Without it windows are never split.
+            concurrency (int): How many windows are scraped at once. Defaults to `max_pages`
+                for every account.
+            checkpoint (bool): Checkpoint every window, so a rerun after a crash resumes the
+                unfinished windows from their last cursor. Needs `set_checkpoint_dir`.
+            sink (Sink): Also write every new tweet to this sink as soon as its window is done.
+                The caller closes it.
+        """
+        if since is None or until is None:
+            raise ValueError("harvest_search_range needs both since and until")
+        concurrency = concurrency or self.max_pages * max(len(self.accounts), 1)
+        semaphore = asyncio.Semaphore(concurrency)
+        merged: dict[str, dict] = {}
+
+        async def harvest(window_since: datetime, window_until: datetime):
+            url = self.__search_url(query, from_username, window_until, window_since, replies)
+            async with semaphore:
+                self.logger.info(f"Harvesting window {window_since:%Y-%m-%d} - {window_until:%Y-%m-%d}")
+                tweets, window_pages = await self.__search_window(url, pages, checkpoint)
+            for tweet in tweets:
+                tweet_id = get_tweet_id(tweet)
+                if tweet_id not in merged:
+                    merged[tweet_id] = tweet
+                    if sink is not None:
+                        await sink.append_async(tweet)
+
+            days = (window_until - window_since).days
+            if pages and window_pages >= pages and days > 1:
+                middle = window_since + timedelta(days=days // 2)
+                self.logger.info(f"Window {window_since:%Y-%m-%d} - {window_until:%Y-%m-%d} reached the page limit, splitting it")
+                await asyncio.gather(harvest(window_since, middle), harvest(middle, window_until))
+
+        windows = []
+        window_since = since
+        while window_since < until:
+            window_until = min(window_since + timedelta(days=window_days), until)
+            windows.append(harvest(window_since, window_until))
+            window_since = window_until
+        await asyncio.gather(*windows)
+
+        tweets = sorted(merged.values(), key=lambda tweet: int(get_tweet_id(tweet) or 0), reverse=True)
+        self.logger.info(f"Finish harvesting search range. Got {len(tweets)} tweets")
+        return tweets
+
+
     async def __get_tweet_detail_responses(
         self,
         url: str,
+        tweet_detail: ResponseBuffer,
         **kwargs
-    ) -> list[Response]:
-        tweet_detail: list[Response] = []
+    ):
+        try:
+            if kwargs.get("scroll") and tweet_detail.resuming:
+                await self.__paginate_directly(tweet_detail, **kwargs)
+                return
+            async with self.__intercepted_page("TweetDetail", tweet_detail) as page:
+                with self.metrics.time("goto"):
+                    await page.goto(url)
+                await page.wait_for_selector("[data-testid='tweet']")
+                if kwargs.get("scroll") and not self.direct_pagination:
+                    await self.__infinite_scroll(page, tweet_detail, tweet_detail.rate_limit, **kwargs)
+            if kwargs.get("scroll") and self.direct_pagination:
+                await self.__paginate_directly(tweet_detail, **kwargs)
+        finally:
+            tweet_detail.close()
 
-        await self.__create_page()
-        self.page.on("response", await self.__create_interceptor_function("TweetDetail", tweet_detail))
-        await self.page.goto(url)
-        await self.page.wait_for_selector("[data-testid='tweet']")
-        if kwargs.get("scroll"):
-            await self.__infinite_scroll(tweet_detail, **kwargs)
-        return tweet_detail
+    async def __load_tweet_detail(self, url: str) -> ResponseBuffer:
+        responses = ResponseBuffer()
+        await self.__get_tweet_detail_responses(url, responses)
+        return responses
 
     async def get_tweet_detail(
         self, 
         url: str = None, 
-        tweetid: str = None
+        tweetid: str = None,
+        bypass_cache: bool = False,
     ) -> dict:
+        """
+        Get a tweet by its url or id.
+
+        Args:
+            url (str): The tweet's url.
+            tweetid (str): The tweet's id, used when `url` is not given.
+            bypass_cache (bool): Load the tweet even when the response cache has it. The
+                fresh result is still cached.
+        """
         if not url:
             url = f"https://twitter.com/a/status/{tweetid}"
+        variables = {"focalTweetId": tweetid or url.split("/status/")[-1].split("/")[0].split("?")[0]}
+        if self.response_cache is not None and not bypass_cache:
+            tweet = self.response_cache.get("TweetDetail", variables)
+            if tweet is not None:
+                self.logger.debug(f"Serving tweet {variables['focalTweetId']} from the cache")
+                return tweet
 
         self.logger.info("Start getting tweet detail from Twitter")
 
-        tweets: list[dict] = []
-        responses = await self.__get_tweet_detail_responses(url)
-        for response in responses:
-            tweets.extend(get_jsonpath_result( await response.json(), "$..entries..itemContent.tweet_results.result" ))
+        tweet = None
+        responses = await self.__load_tweet_detail(url)
+        async for record in responses:
+            # The page of a reply starts with its ancestors, so pick the focal tweet by id
+            tweet = tweet or self.__focal_tweet(record, variables["focalTweetId"])
 
+        if tweet is None:
+            self.logger.warning(f"Tweet {variables['focalTweetId']} not found")
+            return None
         self.logger.info(f"Finish getting tweet detail")
 
-        return tweets[0]
-        
-    async def get_tweet_replies(
+        if self.response_cache is not None:
+            self.response_cache.set("TweetDetail", variables, tweet)
+        return tweet
+
+    async def iter_tweet_replies(
         self,
         url: str = None,
         tweetid: str = None,
         pages: int = None,
         count: int = None,
         click_replies: bool = False,
-        click_additional_replies: bool = False
-    ) -> list[dict]:
+        click_additional_replies: bool = False,
+        as_tweet: bool = False,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> AsyncIterator[dict | Tweet]:
+        """
+        Yield the replies of a tweet as each conversation page arrives. See `get_tweet_replies`.
+
+        With `checkpoint`, every page is logged to disk and a crashed scrape resumes
+        from its last logged cursor. Needs `set_checkpoint_dir`.
+
+        With `sink`, every yielded reply is also written to it as a raw dict. The caller closes it.
+        """
         if not url:
             url = f"https://twitter.com/a/status/{tweetid}"
 
         self.logger.info(f"Start getting tweet replies from Twitter: {url}")
 
-        tweets: list[dict] = []
-        responses = await self.__get_tweet_detail_responses(url, scroll=True, pages=pages, click_replies=click_replies, click_additional_replies=click_additional_replies)
+        buffer = ResponseBuffer()
+        if checkpoint:
+            self.__open_checkpoint(f"replies:{url}", buffer)
+        producer = self.__get_tweet_detail_responses(url, buffer, scroll=True, pages=pages, click_replies=click_replies, click_additional_replies=click_additional_replies)
+        original_skipped = False
+        yielded = 0
+        async with aclosing(self.__stream(producer, buffer)) as responses:
+            async for record in responses:
+                contents = ENTRY_CONTENTS({"entries": record.entries})
+                # Remove non-tweet responses
+                contents = list(filter(lambda x: not bool(CLIENT_EVENT_COMPONENT(x)), contents)) 
+                # Remove ads
+                contents = list(filter(lambda x: not bool(PROMOTED_METADATA(x)), contents))
 
-        for response in responses:
-            tweets.extend(get_jsonpath_result( await response.json(), "$..entries..content" ))
+                tweets = ITEM_TWEET_RESULTS(contents)
+                if click_replies:
+                    tweets.extend(record.module_tweets)
 
-        mpu.io.write(f"res/test/{tweetid}_replies_response.json", tweets)
-        # Remove non-tweet responses
-        tweets = list(filter(lambda x: not bool(get_jsonpath_result(x, "$.clientEventInfo.component")), tweets)) 
-        # Remove ads
-        tweets = list(filter(lambda x: not bool(get_jsonpath_result(x, "$..promotedMetadata")), tweets))
-        
-        tweets = get_jsonpath_result(tweets, "$..itemContent.tweet_results.result")
+                for tweet in tweets:
+                    if not original_skipped: # Skip first tweet because it's the original tweet
+                        original_skipped = True
+                        continue
+                    if sink is not None:
+                        await sink.append_async(tweet)
+                    yield Tweet(tweet) if as_tweet else tweet
+                    yielded += 1
+                    if count and yielded >= count:
+                        buffer.stop_reason = "count"
+                        return
 
-        if click_replies:
-            for response in responses:
-                tweets.extend(get_jsonpath_result( await response.json(), "$..moduleItems..itemContent.tweet_results.result" ))
-        
-        tweets = tweets[1:] # Remove first tweet because it's the original tweet
-        if count: tweets = TweetFilter().filter_by_count(tweets, count)
+    async def get_tweet_replies(
+        self,
+        url: str = None,
+        tweetid: str = None,
+        pages: int = None,
+        count: int = None,
+        click_replies: bool = False,
+        click_additional_replies: bool = False,
+        checkpoint: bool = False,
+        sink: Sink = None,
+    ) -> list[dict]:
+        """
+        Get the replies of a tweet. See `iter_tweet_replies`.
+
+        The replies are no longer dumped to res/test; pass e.g.
+        `sink=JsonArraySink(f"res/test/{tweetid}_replies_response.json")` for the same file.
+        """
+        tweets = [tweet async for tweet in self.iter_tweet_replies(url, tweetid, pages, count, click_replies, click_additional_replies,
+                                                                   checkpoint=checkpoint, sink=sink)]
         self.logger.info(f"Finish getting tweet replies")
 
         return tweets
 
 
+    def __add_conversation_page(self, tree: ConversationTree, record: PageRecord, seen_cursors: set[str]) -> list[str]:
+        """Add the tweets of a TweetDetail page to `tree` and return its new cursors that are worth following."""
+        tree.extend(record.tweets)
+        tree.extend(record.module_tweets)
+        root_replies = len(tree.by_parent.get(tree.root_id, ()))
+        cursors = []
+        for cursor_type in CONVERSATION_CURSORS:
+            if cursor_type in TOP_LEVEL_CURSORS:
+                if tree.max_breadth is not None and root_replies >= tree.max_breadth:
+                    continue # Enough top-level replies
+            elif tree.max_depth is not None and tree.max_depth <= 1:
+                continue # Only the top-level replies are wanted
+            for cursor in find_cursors(record.entries + record.module_items, cursor_type):
+                if cursor not in seen_cursors:
+                    seen_cursors.add(cursor)
+                    cursors.append(cursor)
+        return cursors
+
+    async def get_conversation(
+        self,
+        url: str = None,
+        tweetid: str = None,
+        max_depth: int = None,
+        max_breadth: int = None,
+        pages: int = None,
+    ) -> ConversationTree:
+        """
+        Get the replies of a tweet as a `ConversationTree`.
+
+        Only the first page is loaded in the browser. The rest of the conversation,
+        including the threads behind "Show replies" and "Show more replies", is
+        fetched by following the TweetDetail continuation cursors directly, several
+        at a time, without clicking anything.
+
+        Args:
+            url (str): The tweet's url.
+            tweetid (str): The tweet's id, used when `url` is not given.
+            max_depth (int): Keep replies at most this many levels below the tweet.
+            max_breadth (int): Keep at most this many replies per tweet.
+            pages (int): Stop after this many TweetDetail pages.
+        """
+        if not url:
+            url = f"https://twitter.com/a/status/{tweetid}"
+        root_id = str(tweetid) if tweetid else url.split("/status/")[-1].split("/")[0].split("?")[0]
+        tree = ConversationTree(root_id, max_depth, max_breadth)
+        self.logger.info(f"Start getting conversation from Twitter: {url}")
+
+        responses = await self.__load_tweet_detail(url)
+        if responses.first is None:
+            self.logger.warning("No TweetDetail response was captured, cannot expand the conversation")
+            return tree
+        captured = await CapturedRequest.from_request(responses.first.request)
+        seen_cursors: set[str] = set()
+        frontier: list[str] = []
+        async for record in responses:
+            frontier.extend(self.__add_conversation_page(tree, record, seen_cursors))
+        fetched = len(responses)
+
+        while frontier and (pages is None or fetched < pages):
+            batch_size = self.max_pages if pages is None else min(self.max_pages, pages - fetched)
+            batch, frontier = frontier[:batch_size], frontier[batch_size:]
+            records = await asyncio.gather(*(
+                self.__fetch_directly(captured, captured.url_for(cursor, focalTweetId=root_id)) for cursor in batch
+            ))
+            fetched += len(batch)
+            for record in records:
+                if record is not None:
+                    frontier.extend(self.__add_conversation_page(tree, record, seen_cursors))
+            self.logger.debug(f"Conversation now has {len(tree)} tweets after {fetched} pages")
+
+        self.logger.info(f"Finish getting conversation. Got {len(tree)} tweets in {fetched} pages")
+        return tree
+
+
     async def __get_user_by_screen_name(
         self, 
         url, 
         **kwargs
-    ) -> list[Response]:
-        user_by_screen_name: Response = []
+    ) -> ResponseBuffer:
+        user_by_screen_name = ResponseBuffer()
 
-        await self.__create_page()
-        self.page.on("response", await self.__create_interceptor_function("UserByScreenName", user_by_screen_name))
-        await self.page.goto(url)
-        await self.page.wait_for_selector("[data-testid='UserName']")
+        async with self.__intercepted_page("UserByScreenName", user_by_screen_name) as page:
+            with self.metrics.time("goto"):
+                await page.goto(url)
+            await page.wait_for_selector("[data-testid='UserName']")
+        user_by_screen_name.close()
         return user_by_screen_name
 
     async def get_user_by_screen_name(
         self,
-        screen_name: str
+        screen_name: str,
+        bypass_cache: bool = False,
     ):
+        """
+        Get a user by their handle.
+
+        Args:
+            screen_name (str): The user's handle, without the @.
+            bypass_cache (bool): Load the user even when the response cache has them. The
+                fresh result is still cached.
+        """
         url = f"https://twitter.com/{screen_name}"
+        variables = {"screen_name": screen_name.lower()}
+        if self.response_cache is not None and not bypass_cache:
+            user = self.response_cache.get("UserByScreenName", variables)
+            if user is not None:
+                self.logger.debug(f"Serving user {screen_name} from the cache")
+                return user
 
         response = await self.__get_user_by_screen_name(url)
-        try:
-            user = get_jsonpath_result(await response[0].json(), "$.data.user.result")[0]
-        except IndexError:
-            print("User not found")
-            user = None
+        user = response.first.user if response.first is not None else None
+        if user is None:
+            self.logger.warning(f"User {screen_name} not found")
+            return None
 
+        if self.response_cache is not None:
+            self.response_cache.set("UserByScreenName", variables, user)
         return user
 
 
+    async def __batch_lookup(
+        self,
+        operation: str,
+        keys: list[str],
+        variables_of: Callable[[str], dict],
+        load: Callable[[str], Coroutine],
+        extract: Callable[[PageRecord, str], dict],
+        concurrency: int = None,
+        bypass_cache: bool = False,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Look up every distinct key once, concurrently, and yield the results in completion order.
+
+        Fresh keys are served from the response cache. The others are loaded on a page with
+        `load`, or, with direct pagination, the request of the first loaded page is captured
+        and the rest are GraphQL calls with their `variables_of` swapped in. A failing key
+        yields a result with its error instead of stopping the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.max_pages * max(len(self.accounts), 1))
+        capture_lock = asyncio.Lock()
+        captured: CapturedRequest = None
+
+        async def fetch(key: str) -> PageRecord:
+            nonlocal captured
+            if self.direct_pagination:
+                async with capture_lock:
+                    if captured is None: # Load one page to capture the request, the other keys wait for it
+                        record = (await load(key)).first
+                        if record is not None and record.request is not None:
+                            captured = await CapturedRequest.from_request(record.request)
+                        return record
+                return await self.__fetch_directly(captured, captured.url_for(**variables_of(key)))
+            return (await load(key)).first
+
+        async def lookup(key: str) -> BatchResult:
+            async with semaphore:
+                try:
+                    variables = variables_of(key)
+                    value = None
+                    if self.response_cache is not None and not bypass_cache:
+                        value = self.response_cache.get(operation, variables)
+                    if value is None:
+                        record = await fetch(key)
+                        value = extract(record, key) if record is not None else None
+                        if value is None:
+                            raise LookupError(f"{operation} found nothing for {key}")
+                        if self.response_cache is not None:
+                            self.response_cache.set(operation, variables, value)
+                    return BatchResult(key, value)
+                except Exception as e:
+                    self.logger.warning(f"{operation} lookup of {key} failed: {e}")
+                    return BatchResult(key, error=e)
+
+        tasks = [asyncio.create_task(lookup(key)) for key in dict.fromkeys(keys)]
+        try:
+            for result in asyncio.as_completed(tasks):
+                yield await result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def __focal_tweet(record: PageRecord, tweetid: str) -> dict:
+        for tweet in record.tweets:
+            if get_tweet_id(tweet) == tweetid:
+                return tweet
+        return None
+
+    async def iter_tweet_details(
+        self,
+        tweetids: list[str],
+        concurrency: int = None,
+        bypass_cache: bool = False,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Look up many tweets at once and yield a `BatchResult` per distinct id as soon as it is done.
+
+        Args:
+            tweetids (list[str]): The tweet ids, duplicates are looked up once.
+            concurrency (int): How many lookups run at once. Defaults to `max_pages` for every account.
+            bypass_cache (bool): Ignore the response cache when looking up. Results are still cached.
+        """
+        async with aclosing(self.__batch_lookup(
+            "TweetDetail", [str(tweetid) for tweetid in tweetids],
+            lambda tweetid: {"focalTweetId": tweetid},
+            lambda tweetid: self.__load_tweet_detail(f"https://twitter.com/a/status/{tweetid}"),
+            self.__focal_tweet, concurrency, bypass_cache,
+        )) as results:
+            async for result in results:
+                yield result
+
+    async def get_tweet_details(
+        self,
+        tweetids: list[str],
+        concurrency: int = None,
+        bypass_cache: bool = False,
+    ) -> dict[str, BatchResult]:
+        """Look up many tweets at once. See `iter_tweet_details`. Results are keyed by id, in completion order."""
+        results = {result.key: result async for result in self.iter_tweet_details(tweetids, concurrency, bypass_cache)}
+        self.logger.info(f"Finish getting tweet details. Got {sum(result.ok for result in results.values())} of {len(results)} tweets")
+        return results
+
+    async def iter_users_by_screen_names(
+        self,
+        screen_names: list[str],
+        concurrency: int = None,
+        bypass_cache: bool = False,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Look up many users at once and yield a `BatchResult` per distinct handle as soon as it is done.
+
+        Args:
+            screen_names (list[str]): The handles, with or without the @. Handles differing only in
+                case are looked up once and reported in lower case.
+            concurrency (int): How many lookups run at once. Defaults to `max_pages` for every account.
+            bypass_cache (bool): Ignore the response cache when looking up. Results are still cached.
+        """
+        async with aclosing(self.__batch_lookup(
+            "UserByScreenName", [screen_name.lstrip("@").lower() for screen_name in screen_names],
+            lambda screen_name: {"screen_name": screen_name},
+            lambda screen_name: self.__get_user_by_screen_name(f"https://twitter.com/{screen_name}"),
+            lambda record, screen_name: record.user, concurrency, bypass_cache,
+        )) as results:
+            async for result in results:
+                yield result
+
+    async def get_users_by_screen_names(
+        self,
+        screen_names: list[str],
+        concurrency: int = None,
+        bypass_cache: bool = False,
+    ) -> dict[str, BatchResult]:
+        """Look up many users at once. See `iter_users_by_screen_names`. Results are keyed by lower-case handle, in completion order."""
+        results = {result.key: result async for result in self.iter_users_by_screen_names(screen_names, concurrency, bypass_cache)}
+        self.logger.info(f"Finish getting users. Got {sum(result.ok for result in results.values())} of {len(results)} users")
+        return results
+
+
     async def close_client(self):
-        await self.browser.close()
+        await self.accounts.close()
+        if self.response_cache is not None:
+            self.logger.info(f"Response cache: {self.response_cache.hits} hits, {self.response_cache.misses} misses")
+            self.response_cache.close()
+        if self.browser is not None: # A persistent context has no browser, closing its context closed it
+            await self.browser.close()
         await self.playwright.stop()
         self.logger.info("Closed Twitter API Client")
 
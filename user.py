@@ -1,54 +1,63 @@
-from utils import get_jsonpath_result
+from utils import LazyField, decode_lazy_fields, lazy_slots
+import weakref
+
+USER_FIELDS = (
+    "id", "created_at", "screen_name", "name", "description", "location",
+    "favourites_count", "followers_count", "friends_count", "listed_count", "statuses_count",
+)
+
 
 class User:
-    user_dict: dict = None
+    """
+    A Twitter user decoded lazily from its `user_results.result` dict.
 
-    id: str = None
-    created_at: str = None
-    screen_name: str = None
-    name: str = None
-    description: str = None
-    location: str = None
+    Fields are decoded on first access. With `keep_raw=False` every field is
+    decoded up front and the raw dict is dropped. Use `User.intern` to share one
+    object per `rest_id`.
+    """
 
-    # Statistics
-    favourites_count: int = None
-    followers_count: int = None
-    friends_count: int = None
-    listed_count: int = None
-    statuses_count: int = None
+    __slots__ = ("__weakref__", "_raw", "_legacy") + lazy_slots(*USER_FIELDS)
 
-    #TODO: MAsih banyak yg harus ditambah cokk
+    __interned: "weakref.WeakValueDictionary[str, User]" = weakref.WeakValueDictionary()
 
-    def __init__(self, user: dict):
-        self.user_dict = user
-        self.parse_user_from_dict(user)
+    id: str = LazyField(lambda user: user._raw.get("rest_id") or None)
+    created_at: str = LazyField(lambda user: user._legacy.get("created_at") or None)
+    screen_name: str = LazyField(lambda user: user._legacy.get("screen_name") or None)
+    name: str = LazyField(lambda user: user._legacy.get("name") or None)
+    description: str = LazyField(lambda user: user._legacy.get("description") or None)
+    location: str = LazyField(lambda user: user._legacy.get("location") or None)
 
-    def parse_user_from_dict(self, user: dict):
-        self.id = user.get("rest_id") or None
-        self.created_at = user.get("legacy").get("created_at") or None
-        self.screen_name = user.get("legacy").get("screen_name") or None
-        self.name = user.get("legacy").get("name") or None
-        self.description = user.get("legacy").get("description") or None
-        self.location = user.get("legacy").get("location") or None
+    # Statistics
+    favourites_count: int = LazyField(lambda user: user._legacy.get("favourites_count") or 0)
+    followers_count: int = LazyField(lambda user: user._legacy.get("normal_followers_count") or 0)
+    friends_count: int = LazyField(lambda user: user._legacy.get("friends_count") or 0)
+    listed_count: int = LazyField(lambda user: user._legacy.get("listed_count") or 0)
+    statuses_count: int = LazyField(lambda user: user._legacy.get("statuses_count") or 0)
 
-        self.favourites_count = user.get("legacy").get("favourites_count") or 0
-        self.followers_count = user.get("legacy").get("normal_followers_count") or 0
-        self.friends_count = user.get("legacy").get("friends_count") or 0
-        self.listed_count = user.get("legacy").get("listed_count") or 0
-        self.statuses_count = user.get("legacy").get("statuses_count") or 0
+    def __init__(self, user: dict, keep_raw: bool = True):
+        self._raw = user
+        self._legacy = user.get("legacy") or {}
+        if not keep_raw:
+            decode_lazy_fields(self, USER_FIELDS)
+            self._raw = None
+            self._legacy = None
 
-    #     self.id = get_jsonpath_result(user, "$.rest_id")[0] or None
-    #     self.created_at = get_jsonpath_result(user, "$.legacy.created_at")[0] or None
-    #     self.screen_name = get_jsonpath_result(user, "$.legacy.screen_name")[0] or None
-    #     self.name = get_jsonpath_result(user, "$.legacy.name")[0] or None
-    #     self.description = get_jsonpath_result(user, "$.legacy.description")[0] or None
-    #     self.location = get_jsonpath_result(user, "$.legacy.location")[0] or None
+    @classmethod
+    def intern(cls, user: dict, keep_raw: bool = True) -> "User":
+        """Get the User of `user`'s rest_id, creating it only if no live one exists."""
+        rest_id = user.get("rest_id")
+        if rest_id is None:
+            return cls(user, keep_raw)
+        interned = cls.__interned.get(rest_id)
+        if interned is None:
+            interned = cls(user, keep_raw)
+            cls.__interned[rest_id] = interned
+        return interned
 
-    #     self.favourites_count = get_jsonpath_result(user, "$.legacy.favourites_count")[0] or 0
-    #     self.followers_count = get_jsonpath_result(user, "$.legacy.normal_followers_count")[0] or 0
-    #     self.friends_count = get_jsonpath_result(user, "$.legacy.friends_count")[0] or 0
-    #     self.listed_count = get_jsonpath_result(user, "$.legacy.listed_count")[0] or 0
-    #     self.statuses_count = get_jsonpath_result(user, "$.legacy.statuses_count")[0] or 0
+    @property
+    def user_dict(self) -> dict:
+        """The raw dict, or None when it was not kept."""
+        return self._raw
 
     def __repr__(self) -> str:
         base = "User("
@@ -65,4 +74,4 @@ class User:
         base += "friends_count=" + str(self.friends_count) + ","
         base += "listed_count=" + str(self.listed_count) + ","
         base += "statuses_count=" + str(self.statuses_count) + ")"
-        return base
\ No newline at end of file
+        return base
@@ -1,9 +1,186 @@
-from jsonpath_ng.ext import parse
+from functools import lru_cache
 import datetime
 
-def change_twitter_date_format(date: str, tz_offset: int) -> datetime:
-    return datetime.datetime.strptime(date, "%a %b %d %H:%M:%S %z %Y").replace(tzinfo=
-                                                                                datetime.timezone(datetime.timedelta(hours=tz_offset))
-                                                                               )
+JSONPATH_CACHE_SIZE = 256
+
+TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+TWITTER_DATE_CACHE_SIZE = 65536
+MONTHS = {month: i for i, month in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                              "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1)}
+SNOWFLAKE_EPOCH_MS = 1288834974657
+# Tweets older than this id were created before snowflake ids and carry no timestamp
+FIRST_SNOWFLAKE_ID = 29700859247
+
+def change_twitter_date_format(date: str, tz_offset: float = None) -> datetime.datetime:
+    """
+    Parse a Twitter created_at string into an aware datetime.
+
+    Args:
+        date (str): The date, e.g. "Wed Oct 10 20:19:24 +0000 2018".
+        tz_offset (float): Hours from UTC to convert the result to. Defaults to UTC.
+    """
+    tz = datetime.timezone.utc if tz_offset is None else datetime.timezone(datetime.timedelta(hours=tz_offset))
+    return parse_twitter_date(date, tz)
+
+def _parse_twitter_date(date: str) -> datetime.datetime:
+    # Fixed layout: "Wed Oct 10 20:19:24 +0000 2018"
+    try:
+        offset = date[20:25]
+        tz = datetime.timezone.utc if offset == "+0000" else datetime.timezone(
+            (-1 if offset[0] == "-" else 1) * datetime.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+        return datetime.datetime(int(date[26:30]), MONTHS[date[4:7]], int(date[8:10]),
+                                 int(date[11:13]), int(date[14:16]), int(date[17:19]), tzinfo=tz)
+    except (KeyError, ValueError, IndexError):
+        return datetime.datetime.strptime(date, TWITTER_DATE_FORMAT)
+
+_parse_twitter_date_cached = lru_cache(maxsize=TWITTER_DATE_CACHE_SIZE)(_parse_twitter_date)
+
+def parse_twitter_date(date: str, tz: datetime.tzinfo = datetime.timezone.utc, cache: bool = False) -> datetime.datetime:
+    """
+    Parse a Twitter created_at string without strptime.
+
+    Args:
+        date (str): The date, e.g. "Wed Oct 10 20:19:24 +0000 2018".
+        tz (tzinfo): Timezone of the result. None keeps the offset of the string.
+        cache (bool): Memoize the parse by string, for dates that are parsed repeatedly.
+    """
+    parsed = _parse_twitter_date_cached(date) if cache else _parse_twitter_date(date)
+    if tz is None or parsed.tzinfo == tz:
+        return parsed
+    return parsed.astimezone(tz)
+
+def twitter_date_to_timestamp(date: str, cache: bool = False) -> float:
+    """Parse a Twitter created_at string into epoch seconds."""
+    return (_parse_twitter_date_cached(date) if cache else _parse_twitter_date(date)).timestamp()
+
+def snowflake_to_timestamp(tweet_id: int | str) -> float:
+    """
+    Creation time in epoch seconds encoded in a snowflake tweet id, None for ids
+    older than snowflakes. The result has millisecond precision.
+    """
+    tweet_id = int(tweet_id)
+    if tweet_id < FIRST_SNOWFLAKE_ID:
+        return None
+    return ((tweet_id >> 22) + SNOWFLAKE_EPOCH_MS) / 1000
+
+def snowflake_to_datetime(tweet_id: int | str, tz: datetime.tzinfo = datetime.timezone.utc) -> datetime.datetime:
+    """Creation time encoded in a snowflake tweet id, None for ids older than snowflakes."""
+    timestamp = snowflake_to_timestamp(tweet_id)
+    return datetime.datetime.fromtimestamp(timestamp, tz) if timestamp is not None else None
+
+def twitter_dates_to_datetime64(dates: list[str]):
+    """Convert Twitter created_at strings to a numpy datetime64[s] array in UTC. Missing dates become NaT."""
+    import numpy as np
+
+    isos = []
+    offsets = []
+    for date in dates:
+        if not date:
+            isos.append("NaT")
+            offsets.append(0)
+            continue
+        isos.append(f"{date[26:30]}-{MONTHS[date[4:7]]:02d}-{date[8:10]}T{date[11:19]}")
+        offset = date[20:25]
+        offsets.append(0 if offset == "+0000" else (-1 if offset[0] == "-" else 1) * (int(offset[1:3]) * 3600 + int(offset[3:5]) * 60))
+    result = np.array(isos, dtype="datetime64[s]")
+    offsets = np.asarray(offsets, dtype="timedelta64[s]")
+    return result - offsets if offsets.any() else result
+
+def snowflakes_to_datetime64(tweet_ids: list[int | str]):
+    """Convert snowflake tweet ids to a numpy datetime64[ms] array in UTC. Pre-snowflake ids become NaT."""
+    import numpy as np
+
+    ids = np.asarray([int(tweet_id) for tweet_id in tweet_ids], dtype=np.int64)
+    result = ((ids >> 22) + SNOWFLAKE_EPOCH_MS).astype("datetime64[ms]")
+    result[ids < FIRST_SNOWFLAKE_ID] = np.datetime64("NaT")
+    return result
+
+@lru_cache(maxsize=JSONPATH_CACHE_SIZE)
+def compile_jsonpath(jsonpath: str):
+    """Parse a JSONPath expression once and keep it in a bounded LRU cache."""
+    from jsonpath_ng.ext import parse # Deferred, the parser is only needed once the first page is caught
+    return parse(jsonpath)
+
 def get_jsonpath_result(json: dict, jsonpath: str) -> list:
-    return [match.value for match in parse(jsonpath).find(json)]
\ No newline at end of file
+    return [match.value for match in compile_jsonpath(jsonpath).find(json)]
+
+def get_tweet_id(tweet: dict) -> str:
+    """Get the id of a raw tweet result, including tweets wrapped in TweetWithVisibilityResults."""
+    if "tweet" in tweet and "rest_id" not in tweet:
+        tweet = tweet["tweet"]
+    return tweet.get("rest_id") or tweet.get("legacy", {}).get("id_str")
+
+
+def get_in_reply_to_id(tweet: dict) -> str:
+    """Get the id of the tweet a raw tweet result replies to, None when it is not a reply."""
+    if "tweet" in tweet and "rest_id" not in tweet:
+        tweet = tweet["tweet"]
+    return tweet.get("legacy", {}).get("in_reply_to_status_id_str")
+
+
+class JsonPathExtractor:
+    """A JSONPath expression that is compiled on first use and reused afterwards."""
+
+    __slots__ = ("jsonpath", "__expression")
+
+    def __init__(self, jsonpath: str):
+        self.jsonpath = jsonpath
+        self.__expression = None
+
+    def __call__(self, json: dict) -> list:
+        if self.__expression is None:
+            self.__expression = compile_jsonpath(self.jsonpath)
+        return [match.value for match in self.__expression.find(json)]
+
+    def __repr__(self) -> str:
+        return f"JsonPathExtractor({self.jsonpath!r})"
+
+
+# Extractors for the fixed paths the scrapers and records read, compiled on first use
+ENTRY_CONTENTS = JsonPathExtractor("$..entries..content")
+ITEM_TWEET_RESULTS = JsonPathExtractor("$..itemContent.tweet_results.result")
+CLIENT_EVENT_COMPONENT = JsonPathExtractor("$.clientEventInfo.component")
+PROMOTED_METADATA = JsonPathExtractor("$..promotedMetadata")
+USER_RESULT = JsonPathExtractor("$.data.user.result")
+INSTRUCTIONS = JsonPathExtractor("$..instructions")
+
+
+class LazyField:
+    """
+    A field of a slotted record that is decoded from the raw dict on first access
+    and then stored in the `_<name>` slot of the record.
+    """
+
+    __slots__ = ("decode", "slot")
+
+    def __init__(self, decode):
+        self.decode = decode
+
+    def __set_name__(self, owner, name: str):
+        self.slot = "_" + name
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        try:
+            return getattr(record, self.slot)
+        except AttributeError:
+            value = self.decode(record)
+            setattr(record, self.slot, value)
+            return value
+
+    def __set__(self, record, value):
+        setattr(record, self.slot, value)
+
+
+def decode_lazy_fields(record, names: tuple[str, ...]):
+    """Decode the LazyFields `names` of `record` right away."""
+    fields = type(record).__dict__
+    for name in names:
+        field = fields[name]
+        setattr(record, field.slot, field.decode(record))
+
+
+def lazy_slots(*names: str) -> tuple[str, ...]:
+    """The slot names backing the LazyFields `names`."""
+    return tuple("_" + name for name in names)